@@ -1,18 +1,30 @@
 import pandas as pd
-from dash import Dash, State, dcc, html, Input, Output, dash_table, callback, callback_context
-import plotly.express as px
+from dash import Dash, State, dcc, html, Input, Output, Patch, dash_table, callback, callback_context
+import plotly.graph_objects as go
 from dash_auth import BasicAuth
 import dash_bootstrap_components as dbc
 import os
+import gzip
 from datetime import datetime, timedelta
 import numpy as np
-import base64
-import io
-import pycountry_convert as pc
 from dash.exceptions import PreventUpdate
 import pdfkit
-from flask import send_file
+from flask import Response, g, has_request_context, jsonify, request, send_file, stream_with_context
 import tempfile
+from urllib.parse import unquote, urlencode
+import zlib
+from ingest import REQUEST_CATEGORIES, LogRotated, LogTail, concat_log_frames, format_ipv4, ingest_frames, memory_report, read_logs
+from exports import ExportJobs, content_key
+from metrics import SIZE_BUCKETS, MetricsRegistry
+from query import QUERY_BACKEND, query_backend
+from storage import (CACHE_DIR, SessionDatasetStore, SharedDatasetStore, append_cached_rows, cached_partitions, read_cached_frame,
+                     source_offsets, source_signature, write_cached_frame)
+import threading
+import time
+import cProfile
+import re
+from collections import OrderedDict
+from pathlib import Path
 
 # Initialize the app
 app = Dash(__name__, 
@@ -30,112 +42,745 @@ VALID_USERNAME_PASSWORD_PAIRS = {
 }
 auth = BasicAuth(app, VALID_USERNAME_PASSWORD_PAIRS)
 
-# Function to get continent from country
-def country_to_continent(country_name):
-    try:
-        country_alpha2 = pc.country_name_to_country_alpha2(country_name)
-        continent_code = pc.country_alpha2_to_continent_code(country_alpha2)
-        continent_name = pc.convert_continent_code_to_continent_name(continent_code)
-        return continent_name
-    except:
-        return 'Unknown'
-
-# Load and process data
+# Users allowed to profile their requests
+ADMIN_USERS = set(os.environ.get('ADMIN_USERS', 'admin').split(','))
+
+# Timing and size histograms, summed over all gunicorn workers and served on /metrics
+metrics = MetricsRegistry(os.path.join(CACHE_DIR, 'metrics'))
+stage_seconds = metrics.histogram(
+    'dashboard_stage_seconds', 'Time spent in each stage of loading, filtering, aggregating and rendering', ['stage', 'name']
+)
+request_seconds = metrics.histogram(
+    'http_request_duration_seconds', 'Time to handle a request, by route or Dash callback', ['endpoint']
+)
+response_bytes = metrics.histogram(
+    'http_response_size_bytes', 'Size of a response body, by route or Dash callback', ['endpoint'], buckets=SIZE_BUCKETS
+)
+
+# Print what ingestion found (unresolved countries, memory per column) and return the frame
+def report_ingest(result):
+    if result.unresolved_countries:
+        names = ', '.join(result.unresolved_countries)
+        print(f"Could not resolve {len(result.unresolved_countries)} country names to a continent: {names}")
+    print(f"Log frame memory in bytes per column:\n{memory_report(result.raw_bytes, result.frame).to_string()}")
+    return result.frame
+
+# Specify the exact path to your dataset: a CSV export or Apache/Nginx access log (optionally gzipped), or a directory of them
+DATA_PATH = os.environ.get('LOG_PATH', r'web_server_logs.csv')
+
+# Follow mode: keep reading rows appended to LOG_PATH and publish them every FOLLOW_INTERVAL seconds
+FOLLOW_LOGS = os.environ.get('FOLLOW_LOGS', '').lower() in ('1', 'true', 'yes')
+FOLLOW_INTERVAL = float(os.environ.get('FOLLOW_INTERVAL', '5'))
+
+# Last day of the sample rows shown when the logs cannot be loaded
+SAMPLE_END_DATE = datetime(2026, 10, 17)
+
+# Load and process data; returns the frame and whether it came from the log source rather than the sample fallback
 def load_data():
-    # Specify the exact path to your dataset
-    data_path = r'web_server_logs.csv'
+    data_path = DATA_PATH
+    
+    # Reuse the processed frame from the Parquet cache while the CSV is unchanged. The SQL engine scans the
+    # published files rather than a frame, so for it the cached rows only pass through Arrow on their way there.
+    with stage_seconds.time(stage='load', name='cache'):
+        cached_df = read_cached_frame(data_path, as_table=query_engine is not None)
+    if cached_df is not None:
+        return cached_df, True
     
     try:
-        df = pd.read_csv(data_path)
-        df = df.rename(columns={
-            'Time': 'time_str',
-            'IP Address': 'ip',
-            'URL/Path': 'path',
-            'Status Code': 'status_code',
-            'Country': 'country',
-            'Request Type': 'request_type',
-            'Method': 'http_method'
-        })
-        
-        date_range = pd.date_range(end=datetime.now(), periods=30).date
-        df['date'] = np.random.choice(date_range, size=len(df))
-        df['timestamp'] = pd.to_datetime(df['date'].astype(str) + ' ' + df['time_str'])
-        df = df.drop(['time_str', 'date'], axis=1)
-        
-        if 'Continent' in df.columns:
-            df = df.rename(columns={'Continent': 'continent'})
-        else:
-            df['continent'] = df['country'].apply(country_to_continent)
-        
-        df['request_category'] = df['path'].apply(lambda x: 
-            'Job Request' if '/job' in x.lower() else
-            'Demo Request' if '/demo' in x.lower() else
-            'Event Inquiry' if '/event' in x.lower() else
-            'AI Assistant' if '/ai' in x.lower() or '/virtualassistant' in x.lower() else
-            'Prototype Info' if '/prototype' in x.lower() else
-            'Other'
-        )
-        
-        required_columns = ['timestamp', 'ip', 'path', 'status_code', 'country', 'request_type', 'continent', 'request_category']
-        for col in required_columns:
-            if col not in df.columns:
-                raise ValueError(f"Missing required column: {col}")
-                
-        return df
+        # Taken before reading so the cache never claims rows appended while it was being built
+        signature = source_signature(data_path)
+        with stage_seconds.time(stage='load', name='parse'):
+            df = report_ingest(read_logs(data_path, complete_lines=FOLLOW_LOGS))
+        with stage_seconds.time(stage='load', name='write_cache'):
+            write_cached_frame(df, data_path, signature)
+        return df, True
         
     except Exception as e:
         print(f"Error loading data: {e}")
         num_records = 1000
-        start_date = datetime.now() - timedelta(days=30)
+        # Seeded and on fixed dates, so every worker and restart shows the same sample rows
+        rng = np.random.default_rng(0)
+        start_date = SAMPLE_END_DATE - timedelta(days=30)
         
         df = pd.DataFrame({
-            'timestamp': [start_date + timedelta(seconds=np.random.randint(0, 30*24*60*60)) 
+            'timestamp': [start_date + timedelta(seconds=int(rng.integers(0, 30*24*60*60))) 
                          for _ in range(num_records)],
-            'ip': [f"192.168.{np.random.randint(1,5)}.{np.random.randint(1,255)}" 
+            'ip': [f"192.168.{rng.integers(1,5)}.{rng.integers(1,255)}" 
                    for _ in range(num_records)],
-            'path': np.random.choice(
+            'path': rng.choice(
                 ['/demo', '/job/apply', '/events', '/virtualassistant.php', '/prototype', '/index.html'],
                 size=num_records,
                 p=[0.3, 0.25, 0.2, 0.15, 0.05, 0.05]
             ),
-            'status_code': np.random.choice(
+            'status_code': rng.choice(
                 [200, 302, 304, 400, 404, 500],
                 size=num_records,
                 p=[0.7, 0.15, 0.05, 0.04, 0.04, 0.02]
             ),
-            'country': np.random.choice(
+            'country': rng.choice(
                 ['United States', 'China', 'India', 'Brazil', 'Germany', 
                  'United Kingdom', 'France', 'Japan', 'Nigeria', 'South Africa'],
                 size=num_records
             ),
-            'request_type': np.random.choice(
+            'request_type': rng.choice(
                 ['Demo Request', 'Job Application', 'Event Inquiry', 
                  'AI Assistant Inquiry', 'Prototype Info', None],
                 size=num_records,
                 p=[0.3, 0.25, 0.2, 0.15, 0.05, 0.05]
             ),
-            'http_method': np.random.choice(
+            'http_method': rng.choice(
                 ['GET', 'POST', 'PUT', 'DELETE'],
                 size=num_records,
                 p=[0.85, 0.12, 0.02, 0.01]
             )
         })
         
-        df['continent'] = df['country'].apply(country_to_continent)
-        df['request_category'] = df['path'].apply(lambda x: 
-            'Job Request' if '/job' in x.lower() else
-            'Demo Request' if '/demo' in x.lower() else
-            'Event Inquiry' if '/event' in x.lower() else
-            'AI Assistant' if '/virtualassistant' in x.lower() else
-            'Prototype Info' if '/prototype' in x.lower() else
-            'Other'
+        print(f"Using sample data as fallback; {data_path} is read again on the next start")
+        return report_ingest(ingest_frames([df])), False
+
+# Dimensions of the rollup cube; counts are kept per hour and combination of these
+ROLLUP_DIMENSIONS = ['continent', 'country', 'request_category', 'status_code', 'http_method']
+
+# Pre-aggregate the row-level log frame into the rollup cube
+def build_rollup_cube(data):
+    # Group keys are sorted, so the cube comes out ordered by hour like the frame it is built from
+    dimensions = [c for c in ROLLUP_DIMENSIONS if c in data.columns]
+    hours = data['timestamp'].dt.floor('h')
+    return (
+        data.groupby([hours] + [data[c] for c in dimensions], dropna=False, observed=True)
+        .size()
+        .reset_index(name='count')
+    )
+
+# Fold the cube of newly appended rows into an existing cube, regrouping only the hours they overlap
+def merge_rollup_cubes(cube, added):
+    if not len(added):
+        return cube
+    split = cube['timestamp'].searchsorted(added['timestamp'].iloc[0], side='left')
+    tail = concat_log_frames([cube.iloc[split:], added])
+    dimensions = [c for c in ROLLUP_DIMENSIONS if c in tail.columns]
+    tail = (
+        tail.groupby(['timestamp'] + dimensions, dropna=False, observed=True)['count']
+        .sum()
+        .reset_index()
+    )
+    return concat_log_frames([cube.iloc[:split], tail])
+
+# The dashboard's date range as half-open [start, end) timestamps covering the whole of every day from the
+# start date through the end date. Day boundaries are hour boundaries too, so the rollup cube, the raw rows
+# and the SQL engine all select exactly the same rows.
+def date_range(start_date, end_date):
+    return pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+
+# Positions [lo, hi) of the rows of a frame sorted by timestamp that fall in [start, end)
+def time_bounds(frame, start, end):
+    timestamps = frame['timestamp']
+    return (
+        timestamps.searchsorted(pd.Timestamp(start), side='left'),
+        timestamps.searchsorted(pd.Timestamp(end), side='left')
+    )
+
+# Slice a frame sorted by timestamp to [start, end) with two binary searches
+def time_window(frame, start, end):
+    lo, hi = time_bounds(frame, start, end)
+    return frame.iloc[lo:hi]
+
+# Columns the dashboard dropdowns filter on
+FILTER_COLUMNS = ['continent', 'country', 'request_category']
+
+# Inverted index from each dropdown value to the ascending row positions holding it
+class FilterIndex:
+    # Positions are counted from `offset`, for indexing the rows a cube gained after its first `offset`
+    def __init__(self, frame, offset=0):
+        self.positions = {}
+        for column in FILTER_COLUMNS:
+            if column not in frame.columns:
+                continue
+            codes, values = pd.factorize(frame[column])
+            # A stable sort groups positions by value while keeping each group ascending
+            order = np.argsort(codes, kind='stable')
+            positions = order + offset if offset else order
+            bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+            self.positions[column] = {
+                value: positions[bounds[i]:bounds[i + 1]] for i, value in enumerate(values)
+            }
+    
+    # The index of a cube that starts with the first `split` rows of this index's cube; only the rows after
+    # them are indexed, and the positions kept for the others are shared with this index
+    def extended(self, cube, split):
+        index = FilterIndex(cube.iloc[split:], offset=split)
+        for column, positions in self.positions.items():
+            added = index.positions.setdefault(column, {})
+            for value, kept in positions.items():
+                kept = kept[:np.searchsorted(kept, split)]
+                if value in added:
+                    added[value] = np.concatenate([kept, added[value]])
+                elif len(kept):
+                    added[value] = kept
+        return index
+    
+    # Positions in [lo, hi) matching every (column, value) filter, or None if no filter is set
+    def select(self, filters, lo, hi):
+        selected = None
+        for column, value in filters:
+            positions = self.positions.get(column, {}).get(value, np.empty(0, dtype=np.intp))
+            positions = positions[np.searchsorted(positions, lo):np.searchsorted(positions, hi)]
+            selected = positions if selected is None else np.intersect1d(selected, positions, assume_unique=True)
+        return selected
+
+# Slice a dataset's rollup cube by the dashboard filters
+def filter_cube(dataset, continent, country, request_category, start_date, end_date):
+    # Cut the date range first so the index lookups only keep positions inside it
+    lo, hi = time_bounds(dataset.cube, *date_range(start_date, end_date))
+    filters = [
+        (column, value)
+        for column, value in zip(FILTER_COLUMNS, (continent, country, request_category))
+        if value != 'All'
+    ]
+    positions = dataset.cube_index.select(filters, lo, hi)
+    if positions is None:
+        return dataset.cube.iloc[lo:hi]
+    return dataset.cube.iloc[positions]
+
+# Rows per chunk when streaming raw log rows
+EXPORT_CHUNK_ROWS = 100_000
+
+# Yield the raw log rows matching the filters as CSV text, one chunk at a time
+def filtered_rows_csv(dataset, continent, country, request_category, start_date, end_date, chunk_rows=EXPORT_CHUNK_ROWS):
+    start, end = date_range(start_date, end_date)
+    filters = [
+        (column, value)
+        for column, value in zip(FILTER_COLUMNS, (continent, country, request_category))
+        if value != 'All'
+    ]
+    if dataset.partitions is not None:
+        # Read only the partitions overlapping the date range (and the selected continent), a day at a time
+        parts = dataset.partitions.read_days(start, end, None if continent == 'All' else continent)
+    else:
+        parts = dataset.parts
+    header = True
+    empty = None
+    for part in parts:
+        if empty is None:
+            empty = part.iloc[:0]
+        # Each part is sorted by timestamp, so its rows in the date range are one contiguous slice
+        lo, hi = time_bounds(part, start, end)
+        for offset in range(lo, hi, chunk_rows):
+            chunk = part.iloc[offset:min(offset + chunk_rows, hi)]
+            for column, value in filters:
+                chunk = chunk[chunk[column] == value]
+            if chunk['ip'].dtype == np.uint32:
+                chunk = chunk.assign(ip=format_ipv4(chunk['ip']).to_numpy())
+            yield chunk.to_csv(index=False, header=header)
+            header = False
+    if header:
+        # No rows in the date range: send just the header
+        yield empty.to_csv(index=False)
+
+# Request categories plotted in the daily sales timeline
+SALES_CATEGORIES = ['Job Request', 'Demo Request']
+
+# Group keys of the counts behind each dashboard figure; 'day' buckets the timestamps by day
+AGGREGATIONS = {
+    'continent': ['continent'],
+    'country': ['country'],
+    'timeline': ['day', 'request_category'],
+    'status': ['status_code'],
+    'request_category': ['request_category'],
+}
+
+# Sum the counts of a filtered cube slice by group keys
+def cube_counts(filtered, keys):
+    by = [pd.Grouper(key='timestamp', freq='D') if key == 'day' else key for key in keys]
+    counts = filtered.groupby(by, observed=True)['count'].sum().reset_index()
+    # Grouping orders categorical keys by category order; sort by their values instead, as the SQL engine does,
+    # so charts and CSV exports come out the same with either engine
+    return counts.sort_values(
+        list(counts.columns[:-1]),
+        key=lambda column: column.astype(str) if isinstance(column.dtype, pd.CategoricalDtype) else column,
+        ignore_index=True
+    )
+
+# Styling shared by every dashboard chart
+TRANSPARENT_BACKGROUND = dict(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+
+# Static part of each chart: layout, styling and a fixed set of empty traces.
+# It goes to the browser once with the page layout; filter changes only patch trace data into it.
+def continent_template():
+    return go.Figure(
+        go.Bar(
+            x=[], y=[], text=[],
+            marker=dict(color=[], coloraxis='coloraxis'),
+            texttemplate='%{text:,d}',
+            textposition='outside',
+            hovertemplate='continent=%{x}<br>count=%{y}<extra></extra>'
+        ),
+        layout=dict(
+            title='Requests by Continent',
+            coloraxis=dict(colorscale='Viridis', colorbar=dict(title='count')),
+            xaxis_title='Continent', 
+            yaxis_title='Number of Requests',
+            **TRANSPARENT_BACKGROUND
+        )
+    )
+
+def country_template():
+    return go.Figure(
+        go.Choropleth(
+            locations=[], z=[],
+            locationmode='country names',
+            coloraxis='coloraxis',
+            hovertemplate='country=%{location}<br>count=%{z:,d}<extra></extra>'
+        ),
+        layout=dict(
+            title='Requests by Country',
+            coloraxis=dict(colorscale='Viridis', colorbar=dict(title='count')),
+            geo=dict(showframe=False, showcoastlines=False),
+            **TRANSPARENT_BACKGROUND
+        )
+    )
+
+def timeline_template():
+    return go.Figure(
+        [
+            go.Scatter(
+                x=[], y=[], name=category, mode='lines',
+                hovertemplate='Date=%{x}<br>Number of Requests=%{y}<extra></extra>'
+            )
+            for category in SALES_CATEGORIES
+        ],
+        layout=dict(
+            title='Daily Sales Performance Metrics',
+            xaxis=dict(title='Date', rangeslider=dict(visible=True)),
+            yaxis_title='Number of Requests',
+            legend_title='Request Type',
+            **TRANSPARENT_BACKGROUND
+        )
+    )
+
+def status_template():
+    return go.Figure(
+        go.Pie(
+            labels=[], values=[], hole=0.3,
+            hovertemplate='status_code=%{label}<br>count=%{value}<extra></extra>'
+        ),
+        layout=dict(title='Status Code Distribution', **TRANSPARENT_BACKGROUND)
+    )
+
+def request_category_template():
+    return go.Figure(
+        [
+            go.Bar(
+                x=[], y=[], text=[], name=category,
+                texttemplate='%{text:,d}',
+                textposition='outside',
+                hovertemplate='request_category=%{x}<br>count=%{y}<extra></extra>'
+            )
+            for category in REQUEST_CATEGORIES
+        ],
+        layout=dict(
+            title='Request Category Distribution',
+            barmode='relative',
+            xaxis_title='request_category',
+            yaxis_title='count',
+            legend_title='request_category',
+            **TRANSPARENT_BACKGROUND
+        )
+    )
+
+# Trace data for each chart, one dict of properties per template trace.
+# They only read pre-aggregated (label, count) frames, so the size of what
+# goes to the browser depends on the number of categories rather than rows.
+def continent_traces(continent_counts):
+    counts = continent_counts['count'].tolist()
+    return [{'x': continent_counts['continent'].astype(str).tolist(), 'y': counts, 'text': counts, 'marker': {'color': counts}}]
+
+def country_traces(country_counts):
+    return [{'locations': country_counts['country'].astype(str).tolist(), 'z': country_counts['count'].tolist()}]
+
+def timeline_traces(daily_counts):
+    traces = []
+    for category in SALES_CATEGORIES:
+        series = daily_counts[daily_counts['request_category'] == category]
+        traces.append({'x': series['timestamp'].dt.strftime('%Y-%m-%d').tolist(), 'y': series['count'].tolist()})
+    return traces
+
+def status_traces(status_counts):
+    return [{'labels': status_counts['status_code'].astype(str).tolist(), 'values': status_counts['count'].tolist()}]
+
+def request_category_traces(category_counts):
+    counts = dict(zip(category_counts['request_category'].astype(str), category_counts['count'].tolist()))
+    # Categories without requests keep their trace but drop out of the plot and legend
+    return [
+        {'x': [category], 'y': [counts[category]], 'text': [counts[category]], 'visible': True}
+        if category in counts else
+        {'x': [], 'y': [], 'text': [], 'visible': False}
+        for category in REQUEST_CATEGORIES
+    ]
+
+# Dashboard charts: graph id -> (aggregate name, template, trace builder)
+CHARTS = {
+    'continent-chart': ('continent', continent_template, continent_traces),
+    'country-map': ('country', country_template, country_traces),
+    'requests-over-time': ('timeline', timeline_template, timeline_traces),
+    'status-codes': ('status', status_template, status_traces),
+    'request-breakdown': ('request_category', request_category_template, request_category_traces),
+}
+
+# Charts on each dashboard tab; a tab's charts are only computed while it is the active tab
+TAB_CHARTS = {
+    'geographic': ['continent-chart', 'country-map'],
+    'temporal': ['requests-over-time', 'status-codes', 'request-breakdown'],
+}
+
+# Full figure for a chart from its trace data, for the initial layout and for exports
+def build_figure(chart_id, traces=None):
+    fig = CHARTS[chart_id][1]()
+    for trace, properties in zip(fig.data, traces or []):
+        trace.update(properties)
+    return fig
+
+# Patch that replaces only the trace data of a chart already on the page
+def figure_patch(traces):
+    patch = Patch()
+    for i, properties in enumerate(traces):
+        for key, value in properties.items():
+            if isinstance(value, dict):
+                for sub_key, sub_value in value.items():
+                    patch['data'][i][key][sub_key] = sub_value
+            else:
+                patch['data'][i][key] = value
+    return patch
+
+# Bounded least-recently-used cache for results computed on the server
+class LRUCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    # Drop every entry whose key starts with the given dataset version
+    def discard_version(self, version):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == version]:
+                del self._entries[key]
+
+# Filtered cube slices, keyed by (dataset version, continent, country, category, start, end)
+filtered_cache = LRUCache(max_entries=32)
+
+# Look up the filtered cube slice for a dataset and filters, recomputing it on a cache miss
+def get_filtered_cube(dataset, filters):
+    key = (dataset.version,) + tuple(filters)
+    filtered = filtered_cache.get(key)
+    if filtered is None:
+        with stage_seconds.time(stage='filter', name='cube'):
+            filtered = filter_cube(dataset, *filters)
+        filtered_cache.put(key, filtered)
+    return filtered
+
+# Engine selected by QUERY_BACKEND; None sums the in-memory rollup cube
+query_engine = query_backend()
+
+# Count the rows matching the filters by group keys, scanning the dataset's files when an SQL engine is selected
+def query_counts(dataset, filters, keys):
+    if query_engine is not None and (dataset.files or dataset.partitions is not None):
+        continent, country, request_category, start_date, end_date = filters
+        equal = {
+            column: value
+            for column, value in zip(FILTER_COLUMNS, (continent, country, request_category))
+            if value != 'All'
+        }
+        start, end = date_range(start_date, end_date)
+        files = dataset.files
+        if dataset.partitions is not None:
+            # Only the partitions overlapping the date range (and the selected continent) are scanned
+            files = dataset.partitions.files(start, end, equal.get('continent'))
+        try:
+            with stage_seconds.time(stage='sql', name='/'.join(keys)):
+                return query_engine.counts(files, equal, start, end, keys)
+        except Exception as e:
+            print(f"Error querying {QUERY_BACKEND}, using the rollup cube instead: {e}")
+    filtered = get_filtered_cube(dataset, filters)
+    with stage_seconds.time(stage='groupby', name='/'.join(keys)):
+        return cube_counts(filtered, keys)
+
+# Aggregates and chart trace data, keyed by (dataset version, filters..., aggregate name or chart id).
+# Users cycle through a few filter combinations, so repeat views are answered from here.
+aggregate_cache = LRUCache(max_entries=256)
+figure_cache = LRUCache(max_entries=256)
+
+# Look up the named aggregates for a dataset and filters, computing the missing ones
+def get_aggregates(dataset, filters, names):
+    aggregates = {}
+    for name in names:
+        key = (dataset.version,) + tuple(filters) + (name,)
+        aggregate = aggregate_cache.get(key)
+        if aggregate is None:
+            aggregate = query_counts(dataset, filters, AGGREGATIONS[name])
+            aggregate_cache.put(key, aggregate)
+        aggregates[name] = aggregate
+    return aggregates
+
+# Look up the trace data for a chart, building it from the cached aggregates on a miss
+def get_chart_traces(dataset, filters, chart_id):
+    key = (dataset.version,) + tuple(filters) + (chart_id,)
+    traces = figure_cache.get(key)
+    if traces is None:
+        aggregate_name, _, trace_builder = CHARTS[chart_id]
+        aggregate = get_aggregates(dataset, filters, [aggregate_name])[aggregate_name]
+        with stage_seconds.time(stage='traces', name=chart_id):
+            traces = trace_builder(aggregate)
+        figure_cache.put(key, traces)
+    return traces
+
+# Latest dataset version seen per scope (a user, or 'shared'); when it changes,
+# results cached for the superseded version are dropped
+seen_versions = {}
+
+def note_dataset_version(scope, version):
+    previous = seen_versions.get(scope)
+    if previous == version:
+        return
+    seen_versions[scope] = version
+    if previous is not None:
+        for cache in (filtered_cache, aggregate_cache, figure_cache):
+            cache.discard_version(previous)
+
+# A loaded log frame together with its version and the aggregates built from it.
+# The rows may come as a list of frames, such as the mapped segments of the shared store; they are kept as
+# separate parts, without copying them into one frame, as long as each part follows on from the one before.
+class Dataset:
+    def __init__(self, df, version, cube=None, files=(), partitions=None, cube_index=None):
+        if isinstance(df, list):
+            parts = [part for part in df if len(part)] or df[:1]
+        else:
+            parts = [df]
+        # Frames are sorted at ingestion; only sort (and copy) here if one arrives out of order
+        in_order = all(part['timestamp'].is_monotonic_increasing for part in parts) and all(
+            previous['timestamp'].iloc[-1] <= part['timestamp'].iloc[0] for previous, part in zip(parts, parts[1:])
         )
+        if not in_order:
+            parts = [concat_log_frames(parts).sort_values('timestamp', kind='stable', ignore_index=True)]
+        self.parts = parts
+        self.version = version
+        with stage_seconds.time(stage='cube', name='build' if cube is None else 'reuse'):
+            if cube is None:
+                cube = build_rollup_cube(parts[0])
+                for part in parts[1:]:
+                    cube = merge_rollup_cubes(cube, build_rollup_cube(part))
+            self.cube = cube
+            self.cube_index = FilterIndex(cube) if cube_index is None else cube_index
+        
+        self._set_dropdown_values(self.cube[['continent', 'country']].drop_duplicates(), self.cube['request_category'])
         
-        print("Using sample data as fallback")
-        return df
+        # Shared store files this dataset was loaded from
+        self.segments = []
+        # Files on disk holding exactly these rows, for query engines that scan them;
+        # with partitions, engines only scan the days (and continents) a query selects
+        self.files = list(files)
+        self.partitions = partitions
+    
+    # Earliest and latest row timestamps
+    @property
+    def first_timestamp(self):
+        return self.parts[0]['timestamp'].min()
+    
+    @property
+    def last_timestamp(self):
+        return self.parts[-1]['timestamp'].max()
+    
+    # Values for the dropdowns, from the distinct (continent, country) pairs and the request categories;
+    # countries are listed overall and per continent
+    def _set_dropdown_values(self, pairs, categories):
+        located = pairs.dropna()
+        self.continents = sorted(pairs['continent'].dropna().unique())
+        self.countries = sorted(located['country'].unique())
+        self.countries_by_continent = {
+            continent: sorted(group['country'].unique())
+            for continent, group in located.groupby('continent', observed=True)
+        }
+        self.request_categories = sorted(categories.dropna().unique())
+    
+    # The next version with rows appended. The rows become a new part, and only the cube hours they touch
+    # are regrouped and indexed again, so appending costs time in the new rows rather than the whole dataset.
+    def appended(self, rows, version):
+        with stage_seconds.time(stage='cube', name='append'):
+            added = build_rollup_cube(rows)
+            cube = merge_rollup_cubes(self.cube, added)
+            split = self.cube['timestamp'].searchsorted(added['timestamp'].iloc[0]) if len(added) else len(cube)
+            cube_index = self.cube_index.extended(cube, split)
+        return Dataset(self.parts + [rows], version, cube=cube, cube_index=cube_index)
+
+# A dataset the SQL engine answers from its files. Only the dropdown values and date bounds are read from them
+# up front; the rows, rollup cube and filter index are loaded the first time something needs them, such as a
+# query the engine fails on or a row export with no partitions to stream from.
+class ScannedDataset(Dataset):
+    def __init__(self, load, version, files=(), partitions=None):
+        self.version = version
+        self.segments = []
+        self.files = list(files)
+        self.partitions = partitions
+        self._load = load
+        self._loaded = None
+        self._load_lock = threading.Lock()
+        scanned = self.files or partitions.files()
+        try:
+            with stage_seconds.time(stage='sql', name='dropdowns'):
+                pairs = query_engine.distinct(scanned, ['continent', 'country'])
+                categories = query_engine.distinct(scanned, ['request_category'])['request_category']
+                self._time_span = query_engine.time_span(scanned)
+        except Exception as e:
+            print(f"Error querying {QUERY_BACKEND}, loading the rows instead: {e}")
+            loaded = self.loaded()
+            pairs, categories = loaded.cube[['continent', 'country']].drop_duplicates(), loaded.cube['request_category']
+            self._time_span = (loaded.first_timestamp, loaded.last_timestamp)
+        self._set_dropdown_values(pairs, categories)
+    
+    # The in-memory dataset of the same rows, loaded on first use
+    def loaded(self):
+        with self._load_lock:
+            if self._loaded is None:
+                self._loaded = Dataset(self._load(), self.version)
+            return self._loaded
+    
+    @property
+    def parts(self):
+        return self.loaded().parts
+    
+    @property
+    def cube(self):
+        return self.loaded().cube
+    
+    @property
+    def cube_index(self):
+        return self.loaded().cube_index
+    
+    @property
+    def first_timestamp(self):
+        return self._time_span[0]
+    
+    @property
+    def last_timestamp(self):
+        return self._time_span[1]
+
+# All gunicorn workers share the published dataset through memory-mapped files on local disk
+shared_store = SharedDatasetStore(os.path.join(CACHE_DIR, 'shared'))
+dataset = None
+dataset_lock = threading.Lock()
+
+# Uploaded datasets belong to the user who uploaded them; idle ones are evicted once the budget is used up.
+# SESSION_MEMORY_BUDGET_MB is the total for the server: every gunicorn worker (WEB_CONCURRENCY, which gunicorn
+# also reads for its worker count) keeps its own copies, so each worker gets an equal share of it
+SERVER_WORKERS = max(1, int(os.environ.get('WEB_CONCURRENCY', '1')))
+SESSION_MEMORY_BUDGET = int(os.environ.get('SESSION_MEMORY_BUDGET_MB', '256')) * 1024 * 1024 // SERVER_WORKERS
+session_store = SessionDatasetStore(os.path.join(CACHE_DIR, 'sessions'), SESSION_MEMORY_BUDGET, Dataset)
+
+# The logged-in BasicAuth user for the current request, or None outside a request
+def current_user():
+    if not has_request_context():
+        return None
+    return request.authorization.username if request.authorization else 'anonymous'
 
-# Load the data
-df = load_data()
+# Return the requesting user's uploaded dataset, or the shared dataset if they have not uploaded one
+def current_dataset():
+    user = current_user()
+    if user is not None:
+        user_dataset = session_store.get(user)
+        if user_dataset is not None:
+            note_dataset_version(user, user_dataset.version)
+            return user_dataset
+    return current_shared_dataset()
+
+# Return the shared dataset, mapping a newer published version if another worker made one
+def current_shared_dataset():
+    global dataset
+    manifest = shared_store.current()
+    if manifest is None:
+        manifest = shared_store.publish_if_stale(DATA_PATH, load_data)
+    if dataset is None or dataset.version != manifest['version']:
+        with dataset_lock:
+            if dataset is None or dataset.version != manifest['version']:
+                dataset = load_shared_dataset(dataset, manifest)
+    note_dataset_version('shared', dataset.version)
+    return dataset
+
+# Build the dataset for a manifest, reading only the new segments when it extends the one already loaded
+def load_shared_dataset(previous, manifest):
+    files = manifest['files']
+    paths = [os.path.join(shared_store.root, name) for name in files] if shared_store.enabled else []
+    # The partitioned cache holds the same rows when it was written from the same read of the source
+    partitions = cached_partitions(DATA_PATH)
+    if partitions is None or manifest['source'] is None or partitions.signature != manifest['source']:
+        partitions = None
+    if query_engine is not None and paths:
+        # The engine scans the files, so the rows are not mapped unless it fails
+        updated = ScannedDataset(lambda: shared_store.segments(manifest), manifest['version'], paths, partitions)
+    else:
+        loaded = previous.segments if previous is not None else []
+        if loaded and len(files) > len(loaded) and files[:len(loaded)] == loaded:
+            updated = previous.appended(shared_store.load(manifest, files[len(loaded):]), manifest['version'])
+        else:
+            updated = Dataset(shared_store.segments(manifest), manifest['version'])
+        updated.files = paths
+        updated.partitions = partitions
+    updated.segments = files
+    return updated
+
+# Tail the log source in whichever worker holds the follower lease; the others see new versions in the manifest
+def follow_logs():
+    lease = None
+    tail = None
+    while True:
+        time.sleep(FOLLOW_INTERVAL)
+        try:
+            if lease is None:
+                lease = shared_store.try_lease('follower')
+                if lease is None:
+                    continue
+            if tail is None:
+                # Start from what the published version has read, reloading it if the source changed meanwhile
+                manifest = shared_store.publish_if_stale(DATA_PATH, load_data)
+                if manifest['source'] is None:
+                    continue
+                tail = LogTail(DATA_PATH, manifest['offsets'])
+            result = tail.read()
+            if result is None:
+                continue
+            # Record the source signature only if it describes exactly the rows read so far
+            signature = source_signature(DATA_PATH)
+            source = signature if tail.covers(source_offsets(signature)) else None
+            manifest = shared_store.append(result.frame, source, dict(tail.offsets))
+            append_cached_rows(result.frame, DATA_PATH, source)
+            print(f"Published version {manifest['version']} with {len(result.frame)} appended log rows")
+            if result.unresolved_countries:
+                print(f"Could not resolve country names to a continent: {', '.join(result.unresolved_countries)}")
+        except LogRotated as e:
+            print(f"Reloading {DATA_PATH}: {e}")
+            tail = None
+        except Exception as e:
+            print(f"Error following {DATA_PATH}: {e}")
+            tail = None
+
+# Load the data, reusing the published version unless the CSV changed since it was built
+shared_store.publish_if_stale(DATA_PATH, load_data)
+# The dataset behind the layout's initial dropdown options and date range
+initial_dataset = current_dataset()
+if FOLLOW_LOGS:
+    threading.Thread(target=follow_logs, name='log-follower', daemon=True).start()
 
 # Custom styles
 UPLOAD_STYLE = {
@@ -146,7 +791,8 @@ UPLOAD_STYLE = {
     'borderStyle': 'dashed',
     'borderRadius': '5px',
     'textAlign': 'center',
-    'margin': '10px'
+    'margin': '10px',
+    'cursor': 'pointer'
 }
 
 CARD_STYLE = {
@@ -171,24 +817,26 @@ app.layout = dbc.Container([
     # Upload and filters card
     dbc.Card([
         dbc.CardBody([
-            dcc.Upload(
+            # assets/upload.js streams files dropped or picked here to the /upload route
+            html.Div(
                 id='upload-data',
                 children=html.Div([
                     html.I(className="fas fa-cloud-upload-alt mr-2"),
                     'Drag and Drop or ',
-                    html.A('Select CSV Log File', className="font-weight-bold")
+                    html.A('Select Log File', className="font-weight-bold")
                 ]),
                 style=UPLOAD_STYLE,
-                multiple=False,
-                accept='.csv'
+                **{'data-accept': '.csv,.log,.gz'}
             ),
+            dbc.Progress(id='upload-progress', value=0, style={'display': 'none'}, className="mb-3"),
+            html.Div(id='upload-message'),
             
             dbc.Row([
                 dbc.Col(
                     dcc.Dropdown(
                         id='continent-filter',
                         options=[{'label': 'All Continents', 'value': 'All'}] + 
-                               [{'label': c, 'value': c} for c in sorted(df['continent'].unique())],
+                               [{'label': c, 'value': c} for c in initial_dataset.continents],
                         value='All',
                         placeholder="Filter by Continent",
                         className="mb-3"
@@ -211,7 +859,7 @@ app.layout = dbc.Container([
                     dcc.Dropdown(
                         id='request-category-filter',
                         options=[{'label': 'All Categories', 'value': 'All'}] + 
-                               [{'label': r, 'value': r} for r in sorted(df['request_category'].unique())],
+                               [{'label': r, 'value': r} for r in initial_dataset.request_categories],
                         value='All',
                         placeholder="Filter by Request Category",
                         className="mb-3"
@@ -222,10 +870,10 @@ app.layout = dbc.Container([
                 dbc.Col(
                     dcc.DatePickerRange(
                         id='date-range',
-                        min_date_allowed=df['timestamp'].min(),
-                        max_date_allowed=df['timestamp'].max(),
-                        start_date=df['timestamp'].min(),
-                        end_date=df['timestamp'].max(),
+                        min_date_allowed=initial_dataset.first_timestamp,
+                        max_date_allowed=initial_dataset.last_timestamp,
+                        start_date=initial_dataset.first_timestamp,
+                        end_date=initial_dataset.last_timestamp,
                         display_format='YYYY-MM-DD',
                         className="mb-3"
                     ),
@@ -236,19 +884,20 @@ app.layout = dbc.Container([
     ], style=CARD_STYLE),
     
     # Visualization tabs
-    dbc.Tabs([
-        dbc.Tab(label="🌍 Geographic Analysis", tabClassName="font-weight-bold", children=[
+    dbc.Tabs(id='dashboard-tabs', active_tab='geographic', children=[
+        dbc.Tab(label="🌍 Geographic Analysis", tab_id='geographic', tabClassName="font-weight-bold", children=[
             dbc.Card([
                 dbc.CardBody([
                     dbc.Row([
-                        dbc.Col(dcc.Graph(id='continent-chart')), 
-                        dbc.Col(dcc.Graph(id='country-map'))
+                        dbc.Col(dcc.Graph(id='continent-chart', figure=build_figure('continent-chart'))), 
+                        dbc.Col(dcc.Graph(id='country-map', figure=build_figure('country-map')))
                     ]),
                     dbc.Row(
                         dbc.Col(
                             dbc.ButtonGroup([
                                 dbc.Button("Export as CSV", id="export-geo-csv-btn", color="primary"),
-                                dbc.Button("Export as PDF", id="export-geo-pdf-btn", color="secondary")
+                                dbc.Button("Export as PDF", id="export-geo-pdf-btn", color="secondary"),
+                                dbc.Button("Export raw rows", id="export-geo-rows-link", color="info", external_link=True)
                             ], className="mt-3"),
                             width={"size": 6, "offset": 3},
                             className="text-center"
@@ -258,19 +907,20 @@ app.layout = dbc.Container([
             ], style=CARD_STYLE)
         ]),
         
-        dbc.Tab(label="📈 Temporal Analysis", tabClassName="font-weight-bold", children=[
+        dbc.Tab(label="📈 Temporal Analysis", tab_id='temporal', tabClassName="font-weight-bold", children=[
             dbc.Card([
                 dbc.CardBody([
-                    dbc.Row(dbc.Col(dcc.Graph(id='requests-over-time'))),
+                    dbc.Row(dbc.Col(dcc.Graph(id='requests-over-time', figure=build_figure('requests-over-time')))),
                     dbc.Row([
-                        dbc.Col(dcc.Graph(id='status-codes')), 
-                        dbc.Col(dcc.Graph(id='request-breakdown'))
+                        dbc.Col(dcc.Graph(id='status-codes', figure=build_figure('status-codes'))), 
+                        dbc.Col(dcc.Graph(id='request-breakdown', figure=build_figure('request-breakdown')))
                     ]),
                     dbc.Row(
                         dbc.Col(
                             dbc.ButtonGroup([
                                 dbc.Button("Export as CSV", id="export-temporal-csv-btn", color="primary"),
-                                dbc.Button("Export as PDF", id="export-temporal-pdf-btn", color="secondary")
+                                dbc.Button("Export as PDF", id="export-temporal-pdf-btn", color="secondary"),
+                                dbc.Button("Export raw rows", id="export-temporal-rows-link", color="info", external_link=True)
                             ], className="mt-3"),
                             width={"size": 6, "offset": 3},
                             className="text-center"
@@ -281,11 +931,19 @@ app.layout = dbc.Container([
         ])
     ], className="mt-4"),
     
+    # Export progress and download link
+    dbc.Progress(id='export-progress', value=0, style={'display': 'none'}, className="mt-3"),
+    html.Div(id='export-message', className="mt-3"),
+    
     # Hidden components
-    dcc.Download(id="download-csv"),
+    dcc.Interval(id='export-poll', interval=1000, disabled=True),
+    dcc.Interval(id='dataset-poll', interval=FOLLOW_INTERVAL * 1000, disabled=not FOLLOW_LOGS),
+    dcc.Store(id='dataset-version'),
+    dcc.Store(id='export-job'),
     dcc.Store(id='filtered-data-store'),
-    dcc.Store(id='geo-figures-store'),
-    dcc.Store(id='temp-figures-store')
+    dcc.Store(id='upload-status'),
+    dcc.Store(id='geographic-rendered-key'),
+    dcc.Store(id='temporal-rendered-key')
 ], fluid=True)
 
 # Update country options based on continent selection
@@ -294,321 +952,439 @@ app.layout = dbc.Container([
     Input('continent-filter', 'value')
 )
 def update_country_options(selected_continent):
+    dataset = current_dataset()
     if selected_continent == 'All':
-        countries = sorted(df['country'].unique())
+        countries = dataset.countries
     else:
-        countries = sorted(df[df['continent'] == selected_continent]['country'].unique())
+        countries = dataset.countries_by_continent.get(selected_continent, [])
     
     return [{'label': 'All Countries', 'value': 'All'}] + [{'label': c, 'value': c} for c in countries]
 
-# Main dashboard update callback
+# Pick up a new dataset version, from rows the log follower appended or a finished upload.
+# The date picker's bounds move to the new data, and a range that ended on the last day keeps ending on it.
 @app.callback(
-    [Output('continent-chart', 'figure'),
-     Output('country-map', 'figure'),
-     Output('requests-over-time', 'figure'),
-     Output('status-codes', 'figure'),
-     Output('request-breakdown', 'figure'),
-     Output('filtered-data-store', 'data'),
-     Output('geo-figures-store', 'data'),
-     Output('temp-figures-store', 'data')],
+    [Output('dataset-version', 'data'),
+     Output('date-range', 'min_date_allowed'),
+     Output('date-range', 'max_date_allowed'),
+     Output('date-range', 'start_date'),
+     Output('date-range', 'end_date')],
+    [Input('dataset-poll', 'n_intervals'),
+     Input('upload-status', 'data')],
+    [State('dataset-version', 'data'),
+     State('date-range', 'start_date'),
+     State('date-range', 'end_date'),
+     State('date-range', 'max_date_allowed')],
+    prevent_initial_call=True
+)
+def refresh_dataset(n_intervals, upload_status, shown_version, start_date, end_date, max_date_allowed):
+    dataset = current_dataset()
+    if dataset.version == shown_version:
+        raise PreventUpdate
+    
+    first, last = dataset.first_timestamp.normalize(), dataset.last_timestamp.normalize()
+    start = pd.Timestamp(start_date).normalize() if start_date else first
+    end = pd.Timestamp(end_date).normalize() if end_date else last
+    if not first <= start <= last:
+        start = first
+    if not max_date_allowed or end >= pd.Timestamp(max_date_allowed).normalize() or not start <= end <= last:
+        end = last
+    return (dataset.version,) + tuple(day.date().isoformat() for day in (first, last, start, end))
+
+# Filter callback; the tab callbacks below render charts from its filter key
+@app.callback(
+    Output('filtered-data-store', 'data'),
     [Input('continent-filter', 'value'),
      Input('country-filter', 'value'),
      Input('request-category-filter', 'value'),
      Input('date-range', 'start_date'),
      Input('date-range', 'end_date'),
-     Input('upload-data', 'contents')],
-    [State('upload-data', 'filename')]
+     Input('dataset-version', 'data')]
 )
-def update_dashboard(continent, country, request_category, start_date, end_date, upload_contents, filename):
-    global df
-    
-    ctx = callback_context
-    triggered_prop_id = ctx.triggered[0]['prop_id'] if ctx.triggered else None
-    
-    if upload_contents and triggered_prop_id == 'upload-data.contents':
-        content_type, content_string = upload_contents.split(',')
-        decoded = base64.b64decode(content_string)
-        try:
-            new_df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-            new_df = new_df.rename(columns={
-                'Time': 'time_str',
-                'IP Address': 'ip',
-                'URL/Path': 'path',
-                'Status Code': 'status_code',
-                'Country': 'country',
-                'Request Type': 'request_type',
-                'Method': 'http_method'
-            })
-            
-            date_range = pd.date_range(end=datetime.now(), periods=30).date
-            new_df['date'] = np.random.choice(date_range, size=len(new_df))
-            new_df['timestamp'] = pd.to_datetime(new_df['date'].astype(str) + ' ' + new_df['time_str'])
-            new_df = new_df.drop(['time_str', 'date'], axis=1)
-            
-            if 'Continent' in new_df.columns:
-                new_df = new_df.rename(columns={'Continent': 'continent'})
-            else:
-                new_df['continent'] = new_df['country'].apply(country_to_continent)
-            
-            new_df['request_category'] = new_df['path'].apply(lambda x: 
-                'Job Request' if '/job' in x.lower() else
-                'Demo Request' if '/demo' in x.lower() else
-                'Event Inquiry' if '/event' in x.lower() else
-                'AI Assistant' if '/ai' in x.lower() or '/virtualassistant' in x.lower() else
-                'Prototype Info' if '/prototype' in x.lower() else
-                'Other'
-            )
-            
-            df = new_df
-            
-        except Exception as e:
-            print(f"Error processing uploaded file: {e}")
+def update_filters(continent, country, request_category, start_date, end_date, dataset_version):
+    # A new version only needs to re-key: current_dataset() already returns the latest data
+    dataset = current_dataset()
     
-    filtered_df = df.copy()
-    if continent != 'All':
-        filtered_df = filtered_df[filtered_df['continent'] == continent]
-    if country != 'All':
-        filtered_df = filtered_df[filtered_df['country'] == country]
-    if request_category != 'All':
-        filtered_df = filtered_df[filtered_df['request_category'] == request_category]
-    
-    filtered_df = filtered_df[
-        (filtered_df['timestamp'] >= start_date) & 
-        (filtered_df['timestamp'] <= end_date)
-    ]
-    
-    # Continent bar chart
-    continent_df = filtered_df.groupby('continent').size().reset_index(name='count')
-    continent_fig = px.bar(
-        continent_df,
-        x='continent',
-        y='count',
-        title='Requests by Continent',
-        color='count',
-        color_continuous_scale='Viridis',
-        text='count'
-    )
-    continent_fig.update_traces(texttemplate='%{text:,d}', textposition='outside')
-    continent_fig.update_layout(
-        xaxis_title='Continent', 
-        yaxis_title='Number of Requests',
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-    
-    # Country map
-    country_df = filtered_df.groupby('country').size().reset_index(name='count')
-    country_fig = px.choropleth(
-        country_df,
-        locations='country',
-        locationmode='country names',
-        color='count',
-        title='Requests by Country',
-        color_continuous_scale='Viridis',
-        hover_data={'country': True, 'count': ':,d'}
-    )
-    country_fig.update_layout(
-        geo=dict(showframe=False, showcoastlines=False),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-    
-    # Time series
-    sales_df = filtered_df[filtered_df['request_category'].isin(['Job Request', 'Demo Request'])]
-    time_df = sales_df.groupby([pd.Grouper(key='timestamp', freq='D'), 'request_category']).size().reset_index(name='count')
-    time_fig = px.line(
-        time_df,
-        x='timestamp',
-        y='count',
-        color='request_category',
-        title='Daily Sales Performance Metrics',
-        labels={'count': 'Number of Requests', 'timestamp': 'Date', 'request_category': 'Request Type'}
-    )
-    time_fig.update_xaxes(rangeslider_visible=True)
-    time_fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-    
-    # Status codes
-    status_fig = px.pie(
-        filtered_df,
-        names='status_code',
-        title='Status Code Distribution',
-        hole=0.3
-    )
-    status_fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-    
-    # Request categories
-    request_fig = px.bar(
-        filtered_df.groupby('request_category').size().reset_index(name='count'),
-        x='request_category',
-        y='count',
-        title='Request Category Distribution',
-        text='count',
-        color='request_category'
-    )
-    request_fig.update_traces(texttemplate='%{text:,d}', textposition='outside')
-    request_fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-    
-    # Store figures for PDF export
-    geo_figures = {
-        'continent': continent_fig.to_dict(),
-        'country': country_fig.to_dict()
-    }
-    
-    temp_figures = {
-        'timeline': time_fig.to_dict(),
-        'status': status_fig.to_dict(),
-        'requests': request_fig.to_dict()
-    }
-    
-    return (
-        continent_fig, 
-        country_fig, 
-        time_fig, 
-        status_fig, 
-        request_fig,
-        filtered_df.to_dict('records'),
-        geo_figures,
-        temp_figures
-    )
+    # Only the cache key goes to the browser; the filtered slice stays on the server
+    return (dataset.version, continent, country, request_category, start_date, end_date)
 
-# CSV Export Callbacks
+# Show the outcome of a streamed upload
 @app.callback(
-    Output("download-csv", "data"),
-    [Input("export-geo-csv-btn", "n_clicks"),
-     Input("export-temporal-csv-btn", "n_clicks")],
-    [State('filtered-data-store', 'data')],
+    Output('upload-message', 'children'),
+    Input('upload-status', 'data'),
     prevent_initial_call=True
 )
-def export_csv(geo_clicks, temp_clicks, data):
-    ctx = callback_context
-    if not ctx.triggered:
+def show_upload_status(upload_status):
+    if not upload_status:
+        raise PreventUpdate
+    if 'error' in upload_status:
+        return dbc.Alert(f"Could not load {upload_status.get('filename', 'the file')}: {upload_status['error']}",
+                         color='danger', dismissable=True)
+    return dbc.Alert(f"Loaded {upload_status['rows']:,} rows from {upload_status['filename']}",
+                     color='success', dismissable=True)
+
+# Patch a tab's charts for a filter key, unless the tab is hidden or already shows that key
+def render_tab(tab_id, filter_key, active_tab, rendered_key):
+    if not filter_key or active_tab != tab_id or rendered_key == filter_key:
         raise PreventUpdate
     
-    df = pd.DataFrame(data)
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
+    dataset = current_dataset()
+    # The layout already holds each chart's static template, so only trace data is sent
+    patches = []
+    for chart_id in TAB_CHARTS[tab_id]:
+        traces = get_chart_traces(dataset, filter_key[1:], chart_id)
+        with stage_seconds.time(stage='patch', name=chart_id):
+            patches.append(figure_patch(traces))
+    return tuple(patches) + (filter_key,)
+
+@app.callback(
+    [Output('continent-chart', 'figure'),
+     Output('country-map', 'figure'),
+     Output('geographic-rendered-key', 'data')],
+    [Input('filtered-data-store', 'data'),
+     Input('dashboard-tabs', 'active_tab')],
+    [State('geographic-rendered-key', 'data')]
+)
+def update_geographic_tab(filter_key, active_tab, rendered_key):
+    return render_tab('geographic', filter_key, active_tab, rendered_key)
+
+@app.callback(
+    [Output('requests-over-time', 'figure'),
+     Output('status-codes', 'figure'),
+     Output('request-breakdown', 'figure'),
+     Output('temporal-rendered-key', 'data')],
+    [Input('filtered-data-store', 'data'),
+     Input('dashboard-tabs', 'active_tab')],
+    [State('temporal-rendered-key', 'data')]
+)
+def update_temporal_tab(filter_key, active_tab, rendered_key):
+    return render_tab('temporal', filter_key, active_tab, rendered_key)
+
+# Size of each read from an upload request body
+UPLOAD_READ_BYTES = 1024 * 1024
+
+# Stream an uploaded log file to disk, then parse and normalise it chunk by chunk.
+# The request body is never held in memory, so large access logs upload without memory spikes.
+@server.route('/upload', methods=['POST'])
+def upload_logs():
+    filename = unquote(request.headers.get('X-File-Name', 'upload.csv'))
+    # The format and compression are sniffed from the content, so the temporary name needs no extension
+    fd, upload_path = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, 'wb') as upload_file:
+            while True:
+                block = request.stream.read(UPLOAD_READ_BYTES)
+                if not block:
+                    break
+                upload_file.write(block)
+        
+        # Parsed on this core: forking a process pool from a serving worker could copy locks held by its other threads
+        user_df = report_ingest(read_logs(upload_path, workers=1))
+        dataset = session_store.put(current_user(), user_df)
+        note_dataset_version(current_user(), dataset.version)
+    except (ValueError, KeyError, UnicodeDecodeError, EOFError, gzip.BadGzipFile, pd.errors.ParserError) as e:
+        print(f"Error processing uploaded file: {e}")
+        return jsonify(filename=filename, error=str(e)), 400
+    finally:
+        os.remove(upload_path)
     
-    if button_id == 'export-geo-csv-btn':
-        geo_data = df.groupby(['continent', 'country', 'request_category']).size().reset_index(name='count')
-        return dcc.send_data_frame(
-            geo_data.to_csv,
-            "geographic_analysis.csv",
-            index=False
-        )
-    elif button_id == 'export-temporal-csv-btn':
-        time_data = df.groupby([
-            pd.Grouper(key='timestamp', freq='D'),
-            'request_category'
-        ]).size().reset_index(name='count')
-        return dcc.send_data_frame(
-            time_data.to_csv,
-            "temporal_analysis.csv",
-            index=False
-        )
+    return jsonify(filename=filename, rows=len(user_df), version=dataset.version)
+
+# Exports run as jobs on a local thread pool; finished files are cached by content under .cache/exports
+export_jobs = ExportJobs(os.path.join(CACHE_DIR, 'exports'))
+
+# Aggregated CSV exports: button -> (file name, group keys of the filtered counts)
+CSV_EXPORTS = {
+    'export-geo-csv-btn': ('geographic_analysis.csv', ['continent', 'country', 'request_category']),
+    'export-temporal-csv-btn': ('temporal_analysis.csv', ['day', 'request_category']),
+}
+
+# PDF reports: button -> (title, file name, [(section heading, chart id)])
+PDF_REPORTS = {
+    'export-geo-pdf-btn': ('Geographic Analysis Report', 'geographic_analysis.pdf', [
+        ('Requests by Continent', 'continent-chart'),
+        ('Requests by Country', 'country-map'),
+    ]),
+    'export-temporal-pdf-btn': ('Temporal Analysis Report', 'temporal_analysis.pdf', [
+        ('Daily Sales Performance', 'requests-over-time'),
+        ('Status Code Distribution', 'status-codes'),
+        ('Request Category Distribution', 'request-breakdown'),
+    ]),
+}
+
+REPORT_TEMPLATE = """
+<html>
+    <head>
+        <meta charset="utf-8">
+        <title>{title}</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; }}
+            .page {{ page-break-after: always; }}
+            h1 {{ color: #2c3e50; }}
+        </style>
+    </head>
+    <body>
+        <h1>{title}</h1>
+        {sections}
+    </body>
+</html>
+"""
+
+# Give wkhtmltopdf time to run plotly.js before it prints the page
+PDF_OPTIONS = {'encoding': 'UTF-8', 'javascript-delay': '2000', 'quiet': ''}
 
-# PDF Export Callbacks
+# Reports load plotly.js and the world map outlines from files shipped in report_assets/, so charts render
+# without network access. wkhtmltopdf runs an old QtWebKit that cannot run current plotly.js bundles, hence
+# the 1.58 build, the last one it renders.
+REPORT_ASSETS = Path(__file__).resolve().parent / 'report_assets'
+PDF_PLOTLYJS = os.environ.get('PDF_PLOTLYJS', (REPORT_ASSETS / 'plotly-1.58.4.min.js').as_uri())
+
+# Directory plotly.js reads world_110m.json (the map outlines) from
+TOPOJSON_URL = os.environ.get('PLOTLY_TOPOJSON_URL', REPORT_ASSETS.as_uri() + '/')
+
+# The report page reads the files above from disk
+PDF_OPTIONS['enable-local-file-access'] = ''
+
+# Count the filtered rows by group keys and write them as CSV, all in the export job
+def csv_renderer(dataset, filters, filename, keys):
+    def render(path, progress):
+        counts = query_counts(dataset, filters, keys)
+        progress(50)
+        with stage_seconds.time(stage='serialize', name=filename):
+            counts.to_csv(path, index=False)
+    return render
+
+# Render report sections to a PDF; the page loads PDF_PLOTLYJS once, before the first chart
+def pdf_renderer(title, filename, sections):
+    chart_config = {'topojsonURL': TOPOJSON_URL}
+    def render(path, progress):
+        with stage_seconds.time(stage='serialize', name=filename):
+            charts = [
+                f'<div class="page"><h2>{heading}</h2>'
+                f'{figure.to_html(full_html=False, include_plotlyjs=PDF_PLOTLYJS if i == 0 else False, default_height="600px", config=chart_config)}</div>'
+                for i, (heading, figure) in enumerate(sections)
+            ]
+        fd, html_path = tempfile.mkstemp(suffix='.html')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(REPORT_TEMPLATE.format(title=title, sections='\n'.join(charts)))
+            progress(40)
+            with stage_seconds.time(stage='render', name=filename):
+                pdfkit.from_file(html_path, path, options=PDF_OPTIONS)
+        finally:
+            os.remove(html_path)
+    return render
+
+# Queue an export for the clicked button; the poll callback below reports on it
 @app.callback(
-    Output("download-csv", "data", allow_duplicate=True),
-    [Input("export-geo-pdf-btn", "n_clicks"),
-     Input("export-temporal-pdf-btn", "n_clicks")],
-    [State('geo-figures-store', 'data'),
-     State('temp-figures-store', 'data')],
+    Output('export-job', 'data'),
+    [Input('export-geo-csv-btn', 'n_clicks'),
+     Input('export-geo-pdf-btn', 'n_clicks'),
+     Input('export-temporal-csv-btn', 'n_clicks'),
+     Input('export-temporal-pdf-btn', 'n_clicks')],
+    State('filtered-data-store', 'data'),
     prevent_initial_call=True
 )
-def export_pdf(geo_clicks, temp_clicks, geo_figures, temp_figures):
-    ctx = callback_context
-    if not ctx.triggered:
+def start_export(geo_csv_clicks, geo_pdf_clicks, temporal_csv_clicks, temporal_pdf_clicks, filter_key):
+    button_id = callback_context.triggered_id
+    if not button_id or not filter_key:
         raise PreventUpdate
     
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
+    # Re-key on the current dataset version in case the data changed since the last render
+    dataset = current_dataset()
+    filters = filter_key[1:]
+    if button_id in CSV_EXPORTS:
+        filename, keys = CSV_EXPORTS[button_id]
+        # A dataset version never changes, so the version and filters identify the file before it is computed
+        key = content_key(filename, str(dataset.version), *(str(value) for value in filters))
+        return export_jobs.submit(current_user(), filename, key, csv_renderer(dataset, filters, filename, keys))
     
-    # Create a temporary HTML file
-    with tempfile.NamedTemporaryFile(suffix='.html', delete=False) as tmp_html:
-        if button_id == 'export-geo-pdf-btn':
-            html_content = f"""
-            <html>
-                <head>
-                    <title>Geographic Analysis Report</title>
-                    <style>
-                        body {{ font-family: Arial, sans-serif; }}
-                        .page {{ page-break-after: always; }}
-                        h1 {{ color: #2c3e50; }}
-                        .chart {{ width: 100%; height: 600px; }}
-                    </style>
-                </head>
-                <body>
-                    <h1>Geographic Analysis Report</h1>
-                    <div class="page">
-                        <h2>Requests by Continent</h2>
-                        <div id="continent-chart" class="chart"></div>
-                    </div>
-                    <div class="page">
-                        <h2>Requests by Country</h2>
-                        <div id="country-map" class="chart"></div>
-                    </div>
-                    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-                    <script>
-                        Plotly.newPlot('continent-chart', {geo_figures['continent']});
-                        Plotly.newPlot('country-map', {geo_figures['country']});
-                    </script>
-                </body>
-            </html>
-            """
-        elif button_id == 'export-temporal-pdf-btn':
-            html_content = f"""
-            <html>
-                <head>
-                    <title>Temporal Analysis Report</title>
-                    <style>
-                        body {{ font-family: Arial, sans-serif; }}
-                        .page {{ page-break-after: always; }}
-                        h1 {{ color: #2c3e50; }}
-                        .chart {{ width: 100%; height: 600px; }}
-                    </style>
-                </head>
-                <body>
-                    <h1>Temporal Analysis Report</h1>
-                    <div class="page">
-                        <h2>Daily Sales Performance</h2>
-                        <div id="timeline-chart" class="chart"></div>
-                    </div>
-                    <div class="page">
-                        <h2>Status Code Distribution</h2>
-                        <div id="status-chart" class="chart"></div>
-                    </div>
-                    <div class="page">
-                        <h2>Request Category Distribution</h2>
-                        <div id="requests-chart" class="chart"></div>
-                    </div>
-                    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-                    <script>
-                        Plotly.newPlot('timeline-chart', {temp_figures['timeline']});
-                        Plotly.newPlot('status-chart', {temp_figures['status']});
-                        Plotly.newPlot('requests-chart', {temp_figures['requests']});
-                    </script>
-                </body>
-            </html>
-            """
-        
-        tmp_html.write(html_content.encode('utf-8'))
-        tmp_html_path = tmp_html.name
+    # Rebuild the full figures on the server instead of keeping copies in the browser
+    title, filename, charts = PDF_REPORTS[button_id]
+    sections = []
+    for heading, chart_id in charts:
+        traces = get_chart_traces(dataset, filters, chart_id)
+        with stage_seconds.time(stage='figure', name=chart_id):
+            sections.append((heading, build_figure(chart_id, traces)))
+    key = content_key(title, PDF_PLOTLYJS, *(figure.to_json() for _, figure in sections))
+    return export_jobs.submit(current_user(), filename, key, pdf_renderer(title, filename, sections))
+
+# Show the progress of the current export while polling, then a link to download it
+@app.callback(
+    [Output('export-progress', 'value'),
+     Output('export-progress', 'style'),
+     Output('export-message', 'children'),
+     Output('export-poll', 'disabled')],
+    [Input('export-job', 'data'),
+     Input('export-poll', 'n_intervals')],
+    prevent_initial_call=True
+)
+def poll_export(job_id, n_intervals):
+    job = export_jobs.get(job_id, current_user())
+    if job is None:
+        raise PreventUpdate
+    hidden = {'display': 'none'}
+    if job['status'] == 'done':
+        message = dbc.Alert([f"{job['filename']} is ready: ", html.A('Download', href=f'/exports/{job_id}')],
+                            color='success', dismissable=True)
+        return 100, hidden, message, True
+    if job['status'] == 'failed':
+        return 0, hidden, dbc.Alert(f"Could not export {job['filename']}: {job['error']}",
+                                    color='danger', dismissable=True), True
+    return job['progress'], {}, f"Exporting {job['filename']}...", False
+
+# Point the raw-rows export links at the current filters
+@app.callback(
+    [Output('export-geo-rows-link', 'href'),
+     Output('export-temporal-rows-link', 'href')],
+    Input('filtered-data-store', 'data')
+)
+def update_rows_export_links(filter_key):
+    if not filter_key:
+        raise PreventUpdate
+    query = urlencode(dict(zip(['continent', 'country', 'request_category', 'start_date', 'end_date'], filter_key[1:])))
+    return f'/exports/rows.csv.gz?{query}', f'/exports/rows.csv.gz?{query}'
+
+# Stream the filtered raw log rows as CSV, gzip-compressed for the .gz name.
+# Rows are formatted chunk by chunk, so the download starts at once and memory stays flat however many rows match.
+@server.route('/exports/rows.csv', defaults={'compress': False})
+@server.route('/exports/rows.csv.gz', defaults={'compress': True})
+def export_rows(compress):
+    dataset = current_dataset()
+    filters = [request.args.get(name, 'All') for name in ('continent', 'country', 'request_category')]
+    start_date = request.args.get('start_date') or dataset.first_timestamp
+    end_date = request.args.get('end_date') or dataset.last_timestamp
+    try:
+        chunks = filtered_rows_csv(dataset, *filters, pd.Timestamp(start_date), pd.Timestamp(end_date))
+    except ValueError as e:
+        return jsonify(error=f'Invalid date: {e}'), 400
     
-    # Convert HTML to PDF
-    pdf_path = tmp_html_path.replace('.html', '.pdf')
+    body = (chunk.encode('utf-8') for chunk in chunks)
+    filename = 'log_rows.csv'
+    if compress:
+        body = gzip_chunks(body)
+        filename += '.gz'
+    return Response(
+        stream_with_context(body),
+        mimetype='application/gzip' if compress else 'text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+# Gzip a stream of byte chunks incrementally
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+# Serve a finished export to the user who requested it
+@server.route('/exports/<job_id>')
+def download_export(job_id):
+    job = export_jobs.get(job_id, current_user())
+    if job is None or job['status'] != 'done' or not os.path.exists(export_jobs.result_path(job)):
+        return jsonify(error='No finished export with this id'), 404
+    return send_file(export_jobs.result_path(job), as_attachment=True, download_name=job['filename'])
+
+# Admins can profile their own requests: /profiling/start sets a cookie, and while it is set each of their
+# requests (page loads and Dash callbacks alike) runs under cProfile, dumped here for pstats or snakeviz
+PROFILE_DIR = os.path.join(CACHE_DIR, 'profiles')
+PROFILE_COOKIE = 'profile_requests'
+PROFILE_FILES = 200
+_PROFILE_NAME_PATTERN = re.compile(r'[0-9]+-[A-Za-z0-9-]+\.prof')
+
+# Metrics label for the current request: the outputs of a Dash callback, otherwise the Flask route.
+# Only callbacks the app registered count as labels, so clients cannot add arbitrary series.
+def request_endpoint():
+    if request.path.endswith('/_dash-update-component'):
+        output = (request.get_json(silent=True) or {}).get('output')
+        return output if isinstance(output, str) and output in app.callback_map else 'unknown'
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+@server.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    if request.cookies.get(PROFILE_COOKIE) and current_user() in ADMIN_USERS:
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@server.after_request
+def record_request_metrics(response):
+    # Requests rejected before start_request_metrics ran (e.g. by BasicAuth) are not measured
+    start = g.pop('request_start', None)
+    if start is None:
+        return response
+    endpoint = request_endpoint()
+    profiler = g.pop('profiler', None)
+    if response.is_streamed and response.content_length is None:
+        # The body is generated after this hook returns, so measure (and profile) it as it is sent
+        response.response = measured_stream(response.response, endpoint, start, profiler)
+        return response
+    if profiler is not None:
+        profiler.disable()
+        save_profile(profiler, endpoint)
+    request_seconds.observe(time.perf_counter() - start, endpoint=endpoint)
+    response_bytes.observe(response.content_length or 0, endpoint=endpoint)
+    return response
+
+# Pass a streamed body through, recording its size and the request duration once it has all been sent,
+# and stopping the request's profiler, if any, only once the body has been generated
+def measured_stream(body, endpoint, start, profiler=None):
+    size = 0
     try:
-        pdfkit.from_file(tmp_html_path, pdf_path)
-        return send_file(pdf_path, as_attachment=True)
-    except Exception as e:
-        print(f"Error generating PDF: {e}")
-        raise PreventUpdate
+        for chunk in body:
+            size += len(chunk)
+            yield chunk
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+        if profiler is not None:
+            profiler.disable()
+            save_profile(profiler, endpoint)
+        request_seconds.observe(time.perf_counter() - start, endpoint=endpoint)
+        response_bytes.observe(size, endpoint=endpoint)
+
+# Dump a request's profile, keeping only the most recent PROFILE_FILES
+def save_profile(profiler, endpoint):
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9]+', '-', endpoint).strip('-')[:80] or 'root'
+        profiler.dump_stats(os.path.join(PROFILE_DIR, f'{time.time_ns()}-{name}.prof'))
+        for old in sorted(os.listdir(PROFILE_DIR), reverse=True)[PROFILE_FILES:]:
+            os.remove(os.path.join(PROFILE_DIR, old))
+    except OSError as e:
+        print(f"Could not save profile for {endpoint}: {e}")
+
+# Prometheus scrape target; every worker's histograms are summed, whichever worker answers
+@server.route('/metrics')
+def serve_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@server.route('/profiling/start', defaults={'enabled': True})
+@server.route('/profiling/stop', defaults={'enabled': False})
+def toggle_profiling(enabled):
+    if current_user() not in ADMIN_USERS:
+        return jsonify(error='Only admins can profile requests'), 403
+    response = jsonify(profiling=enabled, profiles='/profiling/dumps')
+    if enabled:
+        response.set_cookie(PROFILE_COOKIE, '1', httponly=True, samesite='Lax')
+    else:
+        response.delete_cookie(PROFILE_COOKIE)
+    return response
+
+# List the saved profiles, newest first, or download one of them
+@server.route('/profiling/dumps', defaults={'name': None})
+@server.route('/profiling/dumps/<name>')
+def profile_dumps(name):
+    if current_user() not in ADMIN_USERS:
+        return jsonify(error='Only admins can read profiles'), 403
+    if name is None:
+        names = sorted(os.listdir(PROFILE_DIR), reverse=True) if os.path.isdir(PROFILE_DIR) else []
+        return jsonify(profiles=[f'/profiling/dumps/{name}' for name in names])
+    path = os.path.join(PROFILE_DIR, name)
+    if not _PROFILE_NAME_PATTERN.fullmatch(name) or not os.path.exists(path):
+        return jsonify(error='No such profile'), 404
+    return send_file(path, as_attachment=True, download_name=name)
 
 if __name__ == '__main__':
     app.run(debug=True)
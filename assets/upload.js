@@ -0,0 +1,75 @@
+// Streams log files from the upload area to the server's /upload route.
+// dcc.Upload would read the whole file into the page as base64 first.
+(function () {
+    function setProps(id, props) {
+        if (window.dash_clientside && window.dash_clientside.set_props) {
+            window.dash_clientside.set_props(id, props);
+        }
+    }
+
+    function upload(file) {
+        var xhr = new XMLHttpRequest();
+        xhr.open('POST', 'upload');
+        xhr.setRequestHeader('Content-Type', 'application/octet-stream');
+        xhr.setRequestHeader('X-File-Name', encodeURIComponent(file.name));
+
+        setProps('upload-progress', {value: 0, label: '', animated: false, striped: false, style: {display: 'flex'}});
+        xhr.upload.onprogress = function (event) {
+            if (event.lengthComputable) {
+                var percent = Math.round(100 * event.loaded / event.total);
+                setProps('upload-progress', {value: percent, label: percent + '%'});
+            }
+        };
+        xhr.upload.onload = function () {
+            setProps('upload-progress', {value: 100, label: 'Processing…', animated: true, striped: true});
+        };
+        xhr.onload = function () {
+            var result;
+            try {
+                result = JSON.parse(xhr.responseText);
+            } catch (e) {
+                result = {filename: file.name, error: xhr.status + ' ' + xhr.statusText};
+            }
+            setProps('upload-progress', {style: {display: 'none'}});
+            setProps('upload-status', {data: result});
+        };
+        xhr.onerror = function () {
+            setProps('upload-progress', {style: {display: 'none'}});
+            setProps('upload-status', {data: {filename: file.name, error: 'Upload failed'}});
+        };
+        xhr.send(file);
+    }
+
+    function pickFile(zone) {
+        var input = document.createElement('input');
+        input.type = 'file';
+        input.accept = zone.getAttribute('data-accept') || '';
+        input.onchange = function () {
+            if (input.files.length) {
+                upload(input.files[0]);
+            }
+        };
+        input.click();
+    }
+
+    document.addEventListener('click', function (event) {
+        var zone = event.target.closest('#upload-data');
+        if (zone) {
+            event.preventDefault();
+            pickFile(zone);
+        }
+    });
+    document.addEventListener('dragover', function (event) {
+        if (event.target.closest('#upload-data')) {
+            event.preventDefault();
+        }
+    });
+    document.addEventListener('drop', function (event) {
+        if (event.target.closest('#upload-data')) {
+            event.preventDefault();
+            if (event.dataTransfer.files.length) {
+                upload(event.dataTransfer.files[0]);
+            }
+        }
+    });
+})();
@@ -0,0 +1,121 @@
+"""Export jobs rendered on a local thread pool, with finished files cached on disk by content hash"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads rendering exports; rendering mostly waits on wkhtmltopdf, so threads are enough
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', '2'))
+
+# Finished exports kept on disk; the least recently used beyond this are removed
+EXPORT_CACHE_FILES = 64
+
+# Job records are removed after a day; unfinished jobs not updated for ten minutes died with their worker
+JOB_TTL_SECONDS = 24 * 60 * 60
+JOB_TIMEOUT_SECONDS = 10 * 60
+
+_JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+def content_key(*parts):
+    """A hash identifying an export by everything it is rendered from"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8') if isinstance(part, str) else part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class ExportJobs:
+    """Export jobs whose state lives in small JSON files, so any worker process can report progress and serve the file"""
+    
+    def __init__(self, root, workers=EXPORT_WORKERS):
+        self.root = root
+        self.jobs_dir = os.path.join(root, 'jobs')
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        self._prune_lock = threading.Lock()
+    
+    def submit(self, owner, filename, key, render):
+        """Queue render(path, progress) to write the export for `key` unless it is cached; return the job id"""
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        extension = os.path.splitext(filename)[1]
+        job = {
+            'id': uuid.uuid4().hex,
+            'owner': owner,
+            'filename': filename,
+            'file': f'{key}{extension}',
+            'status': 'queued',
+            'progress': 0,
+            'error': None,
+        }
+        path = self.result_path(job)
+        if os.path.exists(path):
+            # Touch the cached file so it counts as recently used
+            os.utime(path)
+            self._save(job, status='done', progress=100)
+        else:
+            self._save(job)
+            self._pool.submit(self._run, job, render)
+        return job['id']
+    
+    def get(self, job_id, owner):
+        """The state of a job, or None if there is no such job for this owner"""
+        if not job_id or not _JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        try:
+            with open(os.path.join(self.jobs_dir, f'{job_id}.json'), encoding='utf-8') as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if job['owner'] != owner:
+            return None
+        if job['status'] in ('queued', 'running') and time.time() - job['updated'] > JOB_TIMEOUT_SECONDS:
+            job.update(status='failed', error='The export was interrupted')
+        return job
+    
+    def result_path(self, job):
+        """Where the finished file of a job is cached"""
+        return os.path.join(self.root, job['file'])
+    
+    def _save(self, job, **changes):
+        job.update(changes, updated=time.time())
+        path = os.path.join(self.jobs_dir, f"{job['id']}.json")
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        os.replace(f'{path}.tmp', path)
+    
+    def _run(self, job, render):
+        path = self.result_path(job)
+        tmp_path = f"{path}.{job['id']}.tmp"
+        try:
+            self._save(job, status='running', progress=5)
+            render(tmp_path, lambda progress: self._save(job, progress=progress))
+            os.replace(tmp_path, path)
+            self._save(job, status='done', progress=100)
+        except Exception as e:
+            print(f"Error exporting {job['filename']}: {e}")
+            self._save(job, status='failed', error=str(e))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._prune()
+    
+    def _prune(self):
+        with self._prune_lock:
+            expired = time.time() - JOB_TTL_SECONDS
+            for entry in os.scandir(self.jobs_dir):
+                if entry.name.endswith('.json') and entry.stat().st_mtime < expired:
+                    os.remove(entry.path)
+            results = sorted(
+                (entry for entry in os.scandir(self.root) if entry.is_file() and not entry.name.endswith('.tmp')),
+                key=lambda entry: entry.stat().st_mtime,
+                reverse=True,
+            )
+            for entry in results[EXPORT_CACHE_FILES:]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    # Another worker pruned it first
+                    continue
@@ -54,6 +54,10 @@ STATUS_CODES = [200, 302, 304, 400, 404, 500]
 STATUS_WEIGHTS = [0.75, 0.15, 0.05, 0.02, 0.02, 0.01]
 
 # Helper functions
+def random_date():
+    """Generate random date within the last 30 days in YYYY-MM-DD format"""
+    return (datetime.now() - timedelta(days=random.randint(0, 29))).strftime("%Y-%m-%d")
+
 def random_time():
     """Generate random time in HH:MM:SS format"""
     hour = random.randint(0, 23)
@@ -106,6 +110,7 @@ def get_continent(country):
 data = []
 for _ in range(NUM_ROWS):
     # Generate timestamp within last 30 days
+    date = random_date()
     time = random_time()
     
     # Generate IP
@@ -126,7 +131,7 @@ for _ in range(NUM_ROWS):
     continent = get_continent(country)
     
     data.append([
-        time, ip, method, url, status_code, request_type, country, continent
+        date, time, ip, method, url, status_code, request_type, country, continent
     ])
 
 # Write to CSV with error handling
@@ -134,7 +139,7 @@ try:
     with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow([
-            "Time", "IP Address", "Method", "URL/Path", 
+            "Date", "Time", "IP Address", "Method", "URL/Path", 
             "Status Code", "Request Type", "Country", "Continent"
         ])
         writer.writerows(data)
@@ -164,7 +169,7 @@ except PermissionError:
             with open(alt_filename, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow([
-                    "Time", "IP Address", "Method", "URL/Path", 
+                    "Date", "Time", "IP Address", "Method", "URL/Path", 
                     "Status Code", "Request Type", "Country", "Continent"
                 ])
                 writer.writerows(data)
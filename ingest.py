@@ -0,0 +1,690 @@
+import fnmatch
+import functools
+import gzip
+import io
+import itertools
+import multiprocessing
+import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pycountry_convert as pc
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pac
+except ImportError:
+    pa = None
+
+# Request category rules, checked in order; the first rule with a matching path fragment wins
+REQUEST_CATEGORY_RULES = [
+    ('Job Request', ['/job']),
+    ('Demo Request', ['/demo']),
+    ('Event Inquiry', ['/event']),
+    ('AI Assistant', ['/ai', '/virtualassistant']),
+    ('Prototype Info', ['/prototype']),
+]
+DEFAULT_REQUEST_CATEGORY = 'Other'
+REQUEST_CATEGORIES = [category for category, _ in REQUEST_CATEGORY_RULES] + [DEFAULT_REQUEST_CATEGORY]
+
+# One case-insensitive alternation per rule
+_CATEGORY_PATTERNS = [
+    re.compile('|'.join(re.escape(fragment) for fragment in fragments), re.IGNORECASE)
+    for _, fragments in REQUEST_CATEGORY_RULES
+]
+
+def classify_request_category(paths):
+    """Classify a column of URL paths into a Categorical of request categories"""
+    # Classify each distinct path once, then broadcast the result back to the rows
+    codes, uniques = pd.factorize(pd.Series(paths))
+    unique_paths = pd.Series(uniques, dtype=object).astype(str)
+    matches = [unique_paths.str.contains(pattern, regex=True).to_numpy() for pattern in _CATEGORY_PATTERNS]
+    default_code = len(REQUEST_CATEGORY_RULES)
+    unique_codes = np.select(matches, range(default_code), default=default_code) if matches else np.array([], dtype=int)
+    # Missing paths have code -1, which picks the trailing default entry
+    unique_codes = np.append(unique_codes, default_code)
+    return pd.Categorical.from_codes(unique_codes[codes], categories=REQUEST_CATEGORIES)
+
+UNKNOWN_CONTINENT = 'Unknown'
+
+# Continents for the countries our logs usually contain, resolved without a pycountry lookup.
+# Also covers names pycountry_convert knows but has no continent for.
+COUNTRY_CONTINENTS = {
+    'United States': 'North America',
+    'Canada': 'North America',
+    'Mexico': 'North America',
+    'Brazil': 'South America',
+    'Argentina': 'South America',
+    'United Kingdom': 'Europe',
+    'Germany': 'Europe',
+    'France': 'Europe',
+    'Russia': 'Europe',
+    'China': 'Asia',
+    'India': 'Asia',
+    'Japan': 'Asia',
+    'South Korea': 'Asia',
+    'Singapore': 'Asia',
+    'United Arab Emirates': 'Asia',
+    'Nigeria': 'Africa',
+    'South Africa': 'Africa',
+    'Kenya': 'Africa',
+    'Egypt': 'Africa',
+    'Australia': 'Oceania',
+    'Kosovo': 'Europe',
+    'Vatican City': 'Europe',
+    'Timor-Leste': 'Asia',
+    'Western Sahara': 'Africa',
+    'Sint Maarten': 'North America',
+    'Pitcairn': 'Oceania',
+    'Antarctica': 'Antarctica',
+}
+
+# Alternative spellings mapped to names pycountry_convert understands
+COUNTRY_ALIASES = {
+    'USA': 'United States',
+    'US': 'United States',
+    'America': 'United States',
+    'UK': 'United Kingdom',
+    'England': 'United Kingdom',
+    'Scotland': 'United Kingdom',
+    'Wales': 'United Kingdom',
+    'Northern Ireland': 'United Kingdom',
+    'UAE': 'United Arab Emirates',
+    'Holland': 'Netherlands',
+    'Burma': 'Myanmar',
+    'DR Congo': 'Democratic Republic of the Congo',
+    "Cote d'Ivoire": 'Ivory Coast',
+    "Côte d'Ivoire": 'Ivory Coast',
+    'Holy See': 'Vatican City',
+    'East Timor': 'Timor-Leste',
+    'The Bahamas': 'Bahamas',
+    'The Gambia': 'Gambia',
+}
+
+@functools.lru_cache(maxsize=None)
+def country_to_continent(country_name):
+    """Resolve a country name to its continent name, or None if it is not recognised"""
+    name = country_name.strip()
+    name = COUNTRY_ALIASES.get(name, name)
+    if name in COUNTRY_CONTINENTS:
+        return COUNTRY_CONTINENTS[name]
+    try:
+        country_alpha2 = pc.country_name_to_country_alpha2(name)
+        continent_code = pc.country_alpha2_to_continent_code(country_alpha2)
+    except (KeyError, TypeError):
+        # pycountry_convert raises KeyError for unknown names and TypeError for some short codes
+        return None
+    return pc.convert_continent_code_to_continent_name(continent_code)
+
+def resolve_continents(countries):
+    """Map a column of country names to a Categorical of continents, plus the names that did not resolve"""
+    # Look up each distinct country once, then broadcast the result back to the rows
+    codes, uniques = pd.factorize(pd.Series(countries))
+    resolved = [country_to_continent(str(country)) for country in uniques]
+    unresolved = sorted(str(country) for country, continent in zip(uniques, resolved) if continent is None)
+    # Missing countries have code -1, which picks the trailing Unknown entry
+    labels = [continent or UNKNOWN_CONTINENT for continent in resolved] + [UNKNOWN_CONTINENT]
+    label_codes, continents = pd.factorize(pd.Series(labels))
+    return pd.Categorical.from_codes(label_codes[codes], categories=continents), unresolved
+
+# Low-cardinality text columns stored as Categorical in the compact log frame
+CATEGORICAL_COLUMNS = ['continent', 'country', 'request_category', 'request_type', 'http_method', 'path']
+
+_IPV4_PATTERN = r'^(?P<a>\d{1,3})\.(?P<b>\d{1,3})\.(?P<c>\d{1,3})\.(?P<d>\d{1,3})$'
+
+def extract_groups(strings, pattern):
+    """Like Series.str.extract for a pattern with named groups, run by Arrow's regex engine when pyarrow is installed"""
+    strings = pd.Series(strings, dtype=object)
+    if pa is None:
+        return strings.str.extract(pattern)
+    groups = pac.extract_regex(pa.array(strings, type=pa.string()), pattern)
+    # Flattening carries a failed match (a null struct) down to every group
+    table = pa.Table.from_arrays(groups.flatten(), names=[field.name for field in groups.type])
+    return table.to_pandas().set_axis(strings.index)
+
+def parse_ipv4(ips):
+    """Pack dotted IPv4 strings into uint32, with a mask of the entries that were plain IPv4 (the others pack to 0)"""
+    octets = extract_groups(pd.Series(ips, dtype=object).astype(str), _IPV4_PATTERN)
+    valid = octets.notna().all(axis=1).to_numpy()
+    # Arrow casts the digit strings without going through Python ints
+    octets = octets.fillna('0').astype('uint32[pyarrow]' if pa is not None else np.uint32).to_numpy(dtype=np.uint32)
+    valid = valid & (octets <= 255).all(axis=1)
+    packed = (octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]
+    packed[~valid] = 0
+    return packed, valid
+
+def pack_ipv4(ips):
+    """Pack dotted IPv4 strings into uint32, or return None if any address is not plain IPv4"""
+    packed, valid = parse_ipv4(ips)
+    return packed if valid.all() else None
+
+def format_ipv4(packed):
+    """Format packed uint32 IPv4 addresses back into dotted strings"""
+    packed = np.asarray(packed, dtype=np.uint32)
+    octets = [pd.Series((packed >> shift) & 255).astype(str) for shift in (24, 16, 8, 0)]
+    return octets[0].str.cat(octets[1:], sep='.')
+
+# CSV of IPv4 ranges for offline country lookups: start, end (dotted or integer) and ISO alpha-2 country code
+# per row, as in the DB-IP and IP2Location lite databases. Unset means countries only come from the logs.
+GEOIP_RANGES = os.environ.get('GEOIP_RANGES')
+
+# Display names for country codes whose pycountry names are formal ("Korea, Republic of")
+COUNTRY_CODE_NAMES = {
+    'KR': 'South Korea',
+    'KP': 'North Korea',
+    'RU': 'Russia',
+    'IR': 'Iran',
+    'VN': 'Vietnam',
+    'TW': 'Taiwan',
+    'SY': 'Syria',
+    'LA': 'Laos',
+    'BO': 'Bolivia',
+    'VE': 'Venezuela',
+    'TZ': 'Tanzania',
+    'MD': 'Moldova',
+    'CD': 'Democratic Republic of the Congo',
+    'XK': 'Kosovo',
+}
+
+# Sorted, non-overlapping IPv4 ranges [starts, ends] and, per range, a code into the countries array
+GeoIPTable = namedtuple('GeoIPTable', ['starts', 'ends', 'codes', 'countries'])
+
+def country_code_name(code):
+    """The country name for an ISO alpha-2 code, or None for unknown or reserved codes"""
+    code = str(code).strip().upper()
+    if code in COUNTRY_CODE_NAMES:
+        return COUNTRY_CODE_NAMES[code]
+    try:
+        return pc.country_alpha2_to_country_name(code)
+    except KeyError:
+        return None
+
+def _range_bounds(values):
+    # Decided per row: integers (IP2Location) are used as they are, dotted addresses are packed, and anything
+    # else (a header row, IPv6) is marked invalid
+    numeric = pd.to_numeric(values, errors='coerce')
+    is_integer = numeric.notna().to_numpy()
+    packed, valid = parse_ipv4(values)
+    bounds = np.where(is_integer, numeric.fillna(0).to_numpy(dtype=np.float64), packed).astype(np.int64)
+    in_range = (bounds >= 0) & (bounds <= 0xFFFFFFFF)
+    return bounds, np.where(is_integer, in_range, valid)
+
+@functools.lru_cache(maxsize=None)
+def load_geoip_table(path):
+    """Read a CSV of IPv4 ranges into a GeoIPTable, skipping IPv6 ranges and a header row"""
+    ranges = pd.read_csv(path, header=None, usecols=[0, 1, 2], names=['start', 'end', 'code'], dtype=str)
+    starts, valid_starts = _range_bounds(ranges['start'])
+    ends, valid_ends = _range_bounds(ranges['end'])
+    valid = valid_starts & valid_ends & (starts <= ends)
+    order = np.argsort(starts[valid], kind='stable')
+    # Resolve each distinct code once; unknown codes point at the trailing None
+    codes, unique_codes = pd.factorize(ranges['code'][valid].iloc[order])
+    names = [country_code_name(code) for code in unique_codes]
+    countries = pd.unique(pd.Series([name for name in names if name is not None], dtype=object))
+    if not len(countries):
+        print(f"No IPv4 ranges with a known country code in {path}; countries will not be looked up from addresses")
+    name_codes = pd.Index(countries).get_indexer(names)
+    return GeoIPTable(
+        starts=starts[valid][order].astype(np.uint32),
+        ends=ends[valid][order].astype(np.uint32),
+        codes=np.append(name_codes, -1)[codes],
+        countries=np.asarray(countries, dtype=object),
+    )
+
+def geoip_table():
+    """The GeoIP table configured by GEOIP_RANGES, loaded once per process, or None if there is none"""
+    return load_geoip_table(GEOIP_RANGES) if GEOIP_RANGES else None
+
+def lookup_country_codes(table, packed):
+    """Country codes into table.countries for packed IPv4 addresses, -1 where no range contains the address"""
+    packed = np.asarray(packed, dtype=np.uint32)
+    if not len(table.starts):
+        return np.full(len(packed), -1)
+    # The candidate is the last range starting at or before the address; it matches if it also ends after it
+    index = np.searchsorted(table.starts, packed, side='right') - 1
+    candidate = np.maximum(index, 0)
+    found = (index >= 0) & (packed <= table.ends[candidate])
+    return np.where(found, table.codes[candidate], -1)
+
+def locate_countries(data, table):
+    """Fill missing or Unknown countries from their IP address, resolving the continent of the rows filled"""
+    if 'country' in data.columns:
+        country = data['country'].astype(object)
+    else:
+        country = pd.Series(None, index=data.index, dtype=object)
+    missing = (country.isna() | (country == UNKNOWN_CONTINENT)).to_numpy()
+    if not missing.any():
+        return data
+    # Parse and look up each distinct address once, then broadcast the result back to the rows
+    codes, uniques = pd.factorize(data['ip'][missing])
+    if data['ip'].dtype == np.uint32:
+        packed, valid = np.asarray(uniques, dtype=np.uint32), np.ones(len(uniques), dtype=bool)
+    else:
+        packed, valid = parse_ipv4(uniques)
+    unique_codes = np.where(valid, lookup_country_codes(table, packed), -1)
+    # Addresses that were missing or not found have code -1, which picks the trailing None
+    located = np.append(table.countries, None)[np.append(unique_codes, -1)[codes]]
+    data = data.copy()
+    country[missing] = located
+    data['country'] = country
+    if 'continent' in data.columns:
+        continents, _ = resolve_continents(located)
+        continent = data['continent'].astype(object)
+        continent[missing] = np.asarray(continents, dtype=object)
+        data['continent'] = continent
+    return data
+
+def compact_log_frame(data):
+    """Return a copy of a log frame with categorical text columns, int16 status codes and packed IPv4"""
+    compact = data.copy()
+    for column in CATEGORICAL_COLUMNS:
+        if column in compact.columns and not isinstance(compact[column].dtype, pd.CategoricalDtype):
+            compact[column] = compact[column].astype('category')
+    if 'status_code' in compact.columns:
+        status_codes = pd.to_numeric(compact['status_code'], errors='coerce')
+        compact['status_code'] = status_codes.astype('Int16' if status_codes.isna().any() else 'int16')
+    if 'ip' in compact.columns and compact['ip'].dtype != np.uint32:
+        # Mixed IPv4/IPv6 or malformed addresses stay as text
+        packed = pack_ipv4(compact['ip'])
+        if packed is not None:
+            compact['ip'] = packed
+    return compact
+
+def column_bytes(data):
+    """Bytes held by each column of a frame"""
+    return data.memory_usage(index=False, deep=True)
+
+def memory_report(before, after):
+    """Bytes per column of a log frame before and after compaction; either side may be precomputed column_bytes"""
+    report = pd.DataFrame({
+        'before': before if isinstance(before, pd.Series) else column_bytes(before),
+        'after': after if isinstance(after, pd.Series) else column_bytes(after),
+    }).fillna(0).astype(np.int64)
+    report.loc['total'] = report.sum()
+    return report
+
+# Column names in our CSV log exports mapped to the names the dashboard uses
+COLUMN_RENAMES = {
+    'Timestamp': 'timestamp',
+    'Date': 'date',
+    'Time': 'time_str',
+    'IP Address': 'ip',
+    'URL/Path': 'path',
+    'Status Code': 'status_code',
+    'Country': 'country',
+    'Request Type': 'request_type',
+    'Method': 'http_method',
+    'Continent': 'continent',
+}
+
+_SOURCE_COLUMNS = {name: source for source, name in COLUMN_RENAMES.items()}
+
+REQUIRED_COLUMNS = ['timestamp', 'ip', 'path', 'status_code', 'country', 'request_type', 'continent', 'request_category']
+
+# Explicit formats for timestamp and date columns; ISO8601 covers "2026-10-17 09:42:13" and "2026-10-17T09:42:13+02:00"
+TIMESTAMP_FORMAT = os.environ.get('LOG_TIMESTAMP_FORMAT', 'ISO8601')
+DATE_FORMAT = os.environ.get('LOG_DATE_FORMAT', '%Y-%m-%d')
+
+# Unit of integer timestamp columns, i.e. epoch seconds by default
+EPOCH_UNIT = os.environ.get('LOG_EPOCH_UNIT', 's')
+
+# Opt-in synthetic dates for logs that only record the time of day: rows are spread over this many days
+# ending on SYNTHETIC_DATE_END (required, so the dates do not move from one day to the next), by a seeded
+# hash of their content
+SYNTHETIC_DATE_DAYS = int(os.environ.get('SYNTHETIC_DATE_DAYS', '0'))
+SYNTHETIC_DATE_SEED = int(os.environ.get('SYNTHETIC_DATE_SEED', '0'))
+SYNTHETIC_DATE_END = os.environ.get('SYNTHETIC_DATE_END')
+
+# Rows in each chunk read from a CSV log file
+CHUNK_ROWS = 200_000
+
+# A normalised, compact log frame, the country names that did not resolve, and the bytes per column before compaction
+IngestResult = namedtuple('IngestResult', ['frame', 'unresolved_countries', 'raw_bytes'])
+
+def synthetic_dates(data):
+    """Seeded dates for time-of-day-only rows; each row's date depends only on its content, not on chunking or worker"""
+    hashes = pd.util.hash_pandas_object(data, index=False, hash_key=f'{SYNTHETIC_DATE_SEED:016d}'[-16:])
+    days_back = (hashes.to_numpy() % SYNTHETIC_DATE_DAYS).astype('timedelta64[D]')
+    end = pd.Timestamp(SYNTHETIC_DATE_END).normalize()
+    return pd.Series(end - days_back, index=data.index)
+
+def parse_timestamps(data):
+    """The timestamp column from a timestamp column, date and time columns, or opted-in synthetic dates"""
+    if 'timestamp' in data.columns:
+        values = data['timestamp']
+        if isinstance(values.dtype, pd.DatetimeTZDtype):
+            return values.dt.tz_convert(None)
+        if pd.api.types.is_datetime64_dtype(values):
+            return values
+        if pd.api.types.is_numeric_dtype(values):
+            return pd.to_datetime(values, unit=EPOCH_UNIT)
+        # Offsets are normalised to UTC; naive values are taken as they are
+        return pd.to_datetime(values, format=TIMESTAMP_FORMAT, utc=True).dt.tz_convert(None)
+    if 'date' in data.columns:
+        dates = pd.to_datetime(data['date'], format=DATE_FORMAT)
+        return dates + pd.to_timedelta(data['time_str']) if 'time_str' in data.columns else dates
+    times = pd.to_timedelta(data['time_str'])
+    if not SYNTHETIC_DATE_DAYS:
+        raise ValueError(
+            "Log rows have a time of day but no date; add a Date or Timestamp column, "
+            "or set SYNTHETIC_DATE_DAYS and SYNTHETIC_DATE_END to spread them over the days up to a fixed date"
+        )
+    if not SYNTHETIC_DATE_END:
+        raise ValueError("SYNTHETIC_DATE_DAYS needs SYNTHETIC_DATE_END, the last date to spread rows over (YYYY-MM-DD)")
+    return synthetic_dates(data) + times
+
+def prepare_log_frame(raw):
+    """Rename a raw log frame's columns and derive timestamp, continent and request_category"""
+    data = raw.rename(columns=COLUMN_RENAMES)
+    
+    try:
+        data['timestamp'] = parse_timestamps(data)
+        data = data.drop(columns=['date', 'time_str'], errors='ignore')
+        
+        geoip = geoip_table()
+        if geoip is not None and 'ip' in data.columns:
+            data = locate_countries(data, geoip)
+        
+        unresolved = []
+        if 'continent' not in data.columns:
+            data['continent'], unresolved = resolve_continents(data['country'])
+        
+        data['request_category'] = classify_request_category(data['path'])
+    except KeyError as e:
+        raise ValueError(f"Missing required column: {_SOURCE_COLUMNS.get(e.args[0], e.args[0])}") from e
+    
+    for column in REQUIRED_COLUMNS:
+        if column not in data.columns:
+            raise ValueError(f"Missing required column: {column}")
+    return data, unresolved
+
+def normalize_log_frame(raw):
+    """Prepare and compact one raw log frame or chunk"""
+    prepared, unresolved = prepare_log_frame(raw)
+    return IngestResult(compact_log_frame(prepared), unresolved, column_bytes(prepared))
+
+def _uniform_categories(parts):
+    # A chunk whose column is entirely blank has float64 categories, which union_categoricals refuses to mix
+    # with text; give those the other chunks' category dtype, and fall back to object if the rest still differ
+    dtypes = {part.cat.categories.dtype for part in parts if len(part.cat.categories)}
+    dtype = dtypes.pop() if len(dtypes) == 1 else object
+    return [
+        part if part.cat.categories.dtype == dtype else part.cat.set_categories(part.cat.categories.astype(dtype))
+        for part in parts
+    ]
+
+def concat_log_frames(frames):
+    """Concatenate compact log frames, taking the union of the categories of their categorical columns"""
+    frames = [frame for frame in frames if len(frame)] or frames[:1]
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    # If some chunks had addresses that could not be packed, keep the whole column as text
+    if 'ip' in frames[0].columns and len({frame['ip'].dtype for frame in frames}) > 1:
+        frames = [
+            frame.assign(ip=format_ipv4(frame['ip']).to_numpy()) if frame['ip'].dtype == np.uint32 else frame
+            for frame in frames
+        ]
+    columns = {}
+    for column in frames[0].columns:
+        parts = [frame[column] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[column] = union_categoricals(_uniform_categories(parts), ignore_order=True)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+def combine_results(results):
+    """Merge normalised chunks into one compact frame sorted by timestamp"""
+    results = list(results)
+    frame = concat_log_frames([result.frame for result in results])
+    frame = frame.sort_values('timestamp', kind='stable', ignore_index=True)
+    unresolved = sorted(set().union(*(result.unresolved_countries for result in results)))
+    raw_bytes = pd.concat([result.raw_bytes for result in results]).groupby(level=0, sort=False).sum()
+    return IngestResult(frame, unresolved, raw_bytes)
+
+def ingest_frames(raw_frames):
+    """Normalise an iterable of raw log frames one at a time and combine them"""
+    return combine_results(normalize_log_frame(raw) for raw in raw_frames)
+
+# Apache/Nginx common and combined log lines; the referrer and user agent of the combined format are not used
+ACCESS_LOG_PATTERN = (
+    r'^(?P<ip>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] '
+    r'"(?P<http_method>[A-Z]+) (?P<path>[^ "?]*)[^"]*" (?P<status_code>\d{3})\b'
+)
+ACCESS_LOG_TIME_FORMAT = '%d/%b/%Y:%H:%M:%S %z'
+
+_ACCESS_LOG_RE = re.compile(ACCESS_LOG_PATTERN)
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+def parse_access_log(lines):
+    """Extract a raw log frame from a Series of access log lines; lines that do not parse are dropped"""
+    fields = extract_groups(lines, ACCESS_LOG_PATTERN).dropna(subset=['time'])
+    # Requests in the same second share a timestamp string, so parse each distinct one once
+    codes, uniques = pd.factorize(fields['time'])
+    times = pd.to_datetime(pd.Series(uniques, dtype=object), format=ACCESS_LOG_TIME_FORMAT, utc=True, errors='coerce')
+    timestamps = times.dt.tz_convert(None).to_numpy()[codes]
+    valid = ~np.isnat(timestamps)
+    fields = fields[valid]
+    return pd.DataFrame({
+        'timestamp': timestamps[valid],
+        'ip': fields['ip'].to_numpy(),
+        'http_method': fields['http_method'].to_numpy(),
+        # Query strings are left out so paths stay low-cardinality
+        'path': fields['path'].to_numpy(),
+        'status_code': fields['status_code'].astype(np.int16).to_numpy(),
+        # Access logs carry neither; rows without a country are shown under the Unknown continent
+        'country': None,
+        'request_type': None,
+    })
+
+def access_log_chunks(lines, chunk_rows=CHUNK_ROWS):
+    """Parse an iterable of access log lines into raw log frames of up to chunk_rows rows"""
+    lines = iter(lines)
+    while True:
+        chunk = list(itertools.islice(lines, chunk_rows))
+        if not chunk:
+            return
+        yield parse_access_log(pd.Series(chunk))
+
+def sniff_log_file(path):
+    """The format of a log file ('csv' or 'access', from its first line) and whether it is gzip-compressed"""
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    with (gzip.open if compressed else open)(path, 'rb') as f:
+        first_line = f.readline(64 * 1024).decode('utf-8', errors='replace')
+    return ('access' if _ACCESS_LOG_RE.match(first_line) else 'csv'), compressed
+
+def parse_log_block(log_format, header, block, chunk_rows=CHUNK_ROWS):
+    """Raw log frames from a block of complete lines of an uncompressed log file"""
+    if log_format == 'csv':
+        return pd.read_csv(io.BytesIO(header + block), chunksize=chunk_rows)
+    return access_log_chunks(io.StringIO(block.decode('utf-8', errors='replace')), chunk_rows)
+
+def read_raw_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Raw log frames from a CSV or access log file, chunk by chunk, decompressing gzip files as they are read"""
+    log_format, compressed = sniff_log_file(path)
+    if log_format == 'csv':
+        with pd.read_csv(path, chunksize=chunk_rows, compression='gzip' if compressed else None) as reader:
+            yield from reader
+        return
+    with (gzip.open if compressed else open)(path, 'rt', encoding='utf-8', errors='replace') as f:
+        yield from access_log_chunks(f, chunk_rows)
+
+# Worker processes for parallel ingestion; 1 reads everything on the calling core
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', os.cpu_count() or 1))
+
+# Inputs smaller than this are not worth starting a process pool for
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+# Upper bound on each byte range handed to a worker, which bounds worker memory
+RANGE_BYTES = 64 * 1024 * 1024
+
+# Files read from a log directory: CSV exports, access logs and gzip-compressed rotations of either
+LOG_FILE_PATTERNS = ['*.csv', '*.log', '*.gz']
+
+def log_files(path):
+    """The log files behind a log path: the file itself, or every log file in a directory"""
+    if os.path.isdir(path):
+        return sorted(
+            entry.path for entry in os.scandir(path)
+            if entry.is_file() and any(fnmatch.fnmatch(entry.name, pattern) for pattern in LOG_FILE_PATTERNS)
+        )
+    return [path]
+
+def complete_size(path, end=None):
+    """Length of a file up to and including the last newline before `end`, leaving out a line still being written"""
+    with open(path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END) if end is None else end
+        while end > 0:
+            start = max(end - 64 * 1024, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
+
+def byte_ranges(path, range_bytes=RANGE_BYTES, min_ranges=1, complete_lines=False, has_header=True):
+    """Split an uncompressed log file after its header line into byte ranges that start and end on line boundaries"""
+    size = complete_size(path) if complete_lines else os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline() if has_header else b''
+        start = f.tell()
+        size = max(size, start)
+        count = max(min_ranges, -(-(size - start) // range_bytes), 1)
+        step = max((size - start) // count, 1)
+        offsets = [start]
+        for i in range(1, count):
+            # Move to the first line that starts after the nominal cut
+            f.seek(start + i * step - 1)
+            f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > offsets[-1]:
+                offsets.append(f.tell())
+    offsets.append(size)
+    return header, list(zip(offsets[:-1], offsets[1:]))
+
+def _ingest_byte_range(path, log_format, header, start, end, chunk_rows):
+    # Runs in a worker process: parse one line-aligned range of a log file (under its header, for CSV)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        block = f.read(end - start)
+    return ingest_frames(parse_log_block(log_format, header, block, chunk_rows))
+
+def _ingest_file(path, chunk_rows):
+    # Runs in a worker process: compressed files cannot be split, so they are read start to end
+    return ingest_frames(read_raw_chunks(path, chunk_rows))
+
+def _can_fork_workers():
+    # Spawned workers re-import the main module, which for `python app.py` means loading the dashboard again.
+    # Forking is only safe while no other thread can be holding a lock the child would inherit, which in the
+    # dashboard means the boot-time load, before the follower, export and request threads exist
+    return (
+        'fork' in multiprocessing.get_all_start_methods() and multiprocessing.parent_process() is None
+        and threading.current_thread() is threading.main_thread() and threading.active_count() == 1
+    )
+
+def read_log_files(paths, workers=None, chunk_rows=CHUNK_ROWS, complete_lines=False):
+    """Read log files, splitting large uncompressed ones into byte ranges that are normalised in a process pool
+
+    With `complete_lines`, a trailing line without a newline is left out as still being written.
+    """
+    workers = INGEST_WORKERS if workers is None else workers
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    serial = workers <= 1 or total_bytes < PARALLEL_MIN_BYTES or not _can_fork_workers()
+    if serial and not complete_lines:
+        return ingest_frames(chunk for path in paths for chunk in read_raw_chunks(path, chunk_rows))
+    
+    tasks = []
+    for path in paths:
+        log_format, compressed = sniff_log_file(path)
+        if compressed:
+            tasks.append((_ingest_file, path, chunk_rows))
+            continue
+        # Give each worker at least one range per file so small multi-file drops still spread out
+        min_ranges = workers if len(paths) == 1 and not serial else 1
+        header, ranges = byte_ranges(
+            path, min_ranges=min_ranges, complete_lines=complete_lines, has_header=log_format == 'csv'
+        )
+        tasks.extend((_ingest_byte_range, path, log_format, header, start, end, chunk_rows) for start, end in ranges)
+    if serial:
+        return combine_results(task(*args) for task, *args in tasks)
+    
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        futures = [pool.submit(*task) for task in tasks]
+        return combine_results(future.result() for future in futures)
+
+def read_logs(source, workers=None, chunk_rows=CHUNK_ROWS, complete_lines=False):
+    """Read a log file or directory of log files in bounded chunks, in parallel when large"""
+    return read_log_files(log_files(source), workers=workers, chunk_rows=chunk_rows, complete_lines=complete_lines)
+
+class LogRotated(Exception):
+    """A followed log file was truncated, replaced or removed, so appended rows can no longer be trusted"""
+
+class LogTail:
+    """Reads the complete lines appended to log files since given byte offsets"""
+    
+    def __init__(self, source, offsets):
+        self.source = source
+        self._inodes = {}
+        self._formats = {}
+        # A directory's offsets also list files that are not logs; a partial last line was not read
+        paths = set(log_files(source)) if os.path.isdir(source) else None
+        self.offsets = {
+            path: complete_size(path, offset) if os.path.exists(path) and not self._format(path)[1] else offset
+            for path, offset in offsets.items()
+            if paths is None or path in paths
+        }
+    
+    def _format(self, path):
+        if path not in self._formats:
+            self._formats[path] = sniff_log_file(path)
+        return self._formats[path]
+    
+    def covers(self, offsets):
+        """Whether every file that still exists has been read up to the given offset"""
+        paths = set(log_files(self.source))
+        return all(self.offsets.get(path) == size for path, size in offsets.items() if path in paths)
+    
+    def read(self):
+        """Normalise the rows appended since the last read, or return None if nothing new was written"""
+        paths = log_files(self.source)
+        if set(self.offsets) - set(paths):
+            raise LogRotated('a log file was removed')
+        frames = []
+        for path in paths:
+            stat = os.stat(path)
+            offset = self.offsets.get(path, 0)
+            if stat.st_size < offset or self._inodes.setdefault(path, stat.st_ino) != stat.st_ino:
+                raise LogRotated(f'{path} was truncated or replaced')
+            if stat.st_size == offset:
+                continue
+            log_format, compressed = self._format(path)
+            if compressed:
+                # A compressed file can only be read whole, e.g. a rotation that appeared in a log directory
+                if offset:
+                    raise LogRotated(f'{path} changed after it was read')
+                frames.extend(read_raw_chunks(path))
+                self.offsets[path] = stat.st_size
+                continue
+            with open(path, 'rb') as f:
+                header = f.readline() if log_format == 'csv' else b''
+                offset = offset or f.tell()
+                f.seek(offset)
+                block = f.read(stat.st_size - offset)
+            # A writer may be mid-line; leave the partial line for the next read
+            end = block.rfind(b'\n') + 1
+            if end == 0:
+                continue
+            frames.extend(parse_log_block(log_format, header, block[:end]))
+            self.offsets[path] = offset + end
+        if not frames:
+            return None
+        return ingest_frames(frames)
@@ -0,0 +1,142 @@
+"""Latency and size histograms merged across worker processes and rendered in the Prometheus text format"""
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Upper bounds of the duration buckets, in seconds
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Upper bounds of the size buckets, in bytes: 256 B to 64 MiB in steps of four
+SIZE_BUCKETS = tuple(4 ** n for n in range(4, 14))
+
+# Each worker writes its histograms to disk at most this often, so /metrics in any worker can merge them
+FLUSH_SECONDS = 5
+
+# Files of workers that stopped writing this long ago are removed
+STALE_SECONDS = 24 * 60 * 60
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+class Histogram:
+    """Observations counted into buckets, per combination of label values"""
+    
+    def __init__(self, registry, name, help_text, labels, buckets):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Label values -> [observations per bucket, with +Inf last; sum of the observed values]
+        self._series = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value, **labels):
+        """Count one observation"""
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+        self.registry.flush_if_due()
+    
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def snapshot(self):
+        """The series as JSON-friendly [label values, bucket counts, sum] lists"""
+        with self._lock:
+            return [[list(key), list(counts), total] for key, (counts, total) in self._series.items()]
+
+class MetricsRegistry:
+    """The histograms of this process, flushed to a file per process under `root`"""
+    
+    def __init__(self, root):
+        self.root = root
+        self._histograms = {}
+        self._flushed = 0.0
+        self._flush_lock = threading.Lock()
+    
+    def histogram(self, name, help_text, labels=(), buckets=DURATION_BUCKETS):
+        """Register a histogram"""
+        histogram = Histogram(self, name, help_text, labels, buckets)
+        self._histograms[name] = histogram
+        return histogram
+    
+    def flush_if_due(self):
+        """Write this process's histograms unless they were written in the last FLUSH_SECONDS"""
+        if time.monotonic() - self._flushed >= FLUSH_SECONDS:
+            self.flush()
+    
+    def flush(self):
+        """Write this process's histograms to its file"""
+        # Skip rather than wait if another thread is already writing
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._flushed = time.monotonic()
+            state = {name: histogram.snapshot() for name, histogram in self._histograms.items()}
+            os.makedirs(self.root, exist_ok=True)
+            path = os.path.join(self.root, f'metrics-{os.getpid()}.json')
+            with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(f'{path}.tmp', path)
+        except OSError as e:
+            print(f"Could not write metrics to {self.root}: {e}")
+        finally:
+            self._flush_lock.release()
+    
+    def render(self):
+        """Every process's histograms summed, in the Prometheus text exposition format"""
+        self.flush()
+        merged = {name: {} for name in self._histograms}
+        expired = time.time() - STALE_SECONDS
+        for entry in os.scandir(self.root):
+            if not (entry.name.startswith('metrics-') and entry.name.endswith('.json')):
+                continue
+            try:
+                if entry.stat().st_mtime < expired:
+                    os.remove(entry.path)
+                    continue
+                with open(entry.path, encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                # The worker is replacing its file right now
+                continue
+            for name, series in state.items():
+                if name not in merged:
+                    continue
+                for key, counts, total in series:
+                    current = merged[name].setdefault(tuple(key), [[0] * len(counts), 0.0])
+                    current[0] = [a + b for a, b in zip(current[0], counts)]
+                    current[1] += total
+        
+        lines = []
+        for name, histogram in self._histograms.items():
+            lines.append(f'# HELP {name} {histogram.help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for key, (counts, total) in sorted(merged[name].items()):
+                labels = [f'{label}="{_escape(value)}"' for label, value in zip(histogram.labels, key)]
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    bucket_labels = ','.join(labels + [f'le="{_format_bound(bound)}"'])
+                    lines.append(f'{name}_bucket{{{bucket_labels}}} {cumulative}')
+                series_labels = '{' + ','.join(labels) + '}' if labels else ''
+                lines.append(f'{name}_sum{series_labels} {total!r}')
+                lines.append(f'{name}_count{series_labels} {cumulative}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,103 @@
+"""Pluggable engines for the dashboard's filtered counts, including an embedded SQL engine that scans the log files on disk"""
+import os
+import threading
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+try:
+    import pyarrow.dataset as pads
+except ImportError:
+    pads = None
+
+# Engine behind the dashboard filters and aggregates: 'pandas' sums the in-memory rollup cube,
+# 'duckdb' scans the Arrow/Parquet files the dataset is stored in. With 'duckdb', workers read only the
+# dropdown values and date bounds of the shared dataset from its files, and load its rows and cube just
+# for the queries the engine fails on.
+QUERY_BACKEND = os.environ.get('QUERY_BACKEND', 'pandas').lower()
+
+# Threads each DuckDB query scans with
+QUERY_THREADS = int(os.environ.get('QUERY_THREADS', str(os.cpu_count() or 1)))
+
+# SQL for group keys that are not plain columns; 'day' buckets timestamps by day
+GROUP_EXPRESSIONS = {'day': "date_trunc('day', \"timestamp\")"}
+
+# Names of the group key columns in the results, matching what pandas grouping produces
+GROUP_COLUMNS = {'day': 'timestamp'}
+
+def file_dataset(files):
+    """A pyarrow dataset over Arrow IPC or Parquet files, which the engine scans without loading them"""
+    file_format = 'ipc' if files[0].endswith('.arrow') else 'parquet'
+    return pads.dataset(files, format=file_format)
+
+class DuckDBBackend:
+    """Counts computed by DuckDB, with the filters pushed down to a multi-threaded scan of the dataset files"""
+    
+    def __init__(self, threads=QUERY_THREADS):
+        self.threads = threads
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def _cursor(self):
+        # Connections do not survive a fork, so each gunicorn worker opens its own on first use
+        with self._lock:
+            if self._connection is None or self._pid != os.getpid():
+                self._connection = duckdb.connect(config={'threads': self.threads})
+                self._pid = os.getpid()
+            return self._connection.cursor()
+    
+    def counts(self, files, equal, start, end, keys):
+        """Rows of `files` with timestamps in [start, end) and columns equal to `equal`, counted by the group keys"""
+        if not files:
+            # Every partition was pruned
+            return pd.DataFrame({
+                GROUP_COLUMNS.get(key, key): pd.Series(dtype='datetime64[us]' if key == 'day' else object)
+                for key in keys + ['count']
+            }).astype({'count': 'int64'})
+        selects = [
+            f'{GROUP_EXPRESSIONS[key]} AS "{GROUP_COLUMNS[key]}"' if key in GROUP_EXPRESSIONS else f'"{key}"'
+            for key in keys
+        ]
+        conditions = ['"timestamp" >= ?', '"timestamp" < ?'] + [f'"{column}" = ?' for column in equal]
+        # Rows with a missing group key are left out, as pandas grouping leaves them out of the cube's counts
+        conditions += [f'"{key}" IS NOT NULL' for key in keys if key not in GROUP_EXPRESSIONS]
+        positions = ', '.join(str(i + 1) for i in range(len(keys)))
+        sql = (
+            f'SELECT {", ".join(selects)}, count(*) AS "count" FROM logs '
+            f'WHERE {" AND ".join(conditions)} GROUP BY {positions} ORDER BY {positions}'
+        )
+        return self._query(files, sql, [start, end, *equal.values()])
+    
+    def distinct(self, files, columns):
+        """The distinct combinations of values of `columns` in `files`, missing values included"""
+        names = ', '.join(f'"{column}"' for column in columns)
+        return self._query(files, f'SELECT DISTINCT {names} FROM logs')
+    
+    def time_span(self, files):
+        """The earliest and latest timestamps in `files`, NaT if they hold no timestamped rows"""
+        first, last = self._query(files, 'SELECT min("timestamp"), max("timestamp") FROM logs').iloc[0]
+        return pd.Timestamp(first), pd.Timestamp(last)
+    
+    def _query(self, files, sql, parameters=()):
+        cursor = self._cursor()
+        try:
+            cursor.register('logs', file_dataset(files))
+            return cursor.execute(sql, list(parameters)).df()
+        finally:
+            cursor.close()
+
+def query_backend(name=QUERY_BACKEND):
+    """The engine for a QUERY_BACKEND name, or None for the default in-memory pandas engine"""
+    if name == 'pandas':
+        return None
+    if name != 'duckdb':
+        raise ValueError(f"Unknown QUERY_BACKEND {name!r}; expected 'pandas' or 'duckdb'")
+    if duckdb is None or pads is None:
+        print("QUERY_BACKEND=duckdb needs the duckdb and pyarrow packages; using pandas")
+        return None
+    return DuckDBBackend()
@@ -0,0 +1,533 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from ingest import (DATE_FORMAT, EPOCH_UNIT, GEOIP_RANGES, SYNTHETIC_DATE_DAYS, SYNTHETIC_DATE_END, SYNTHETIC_DATE_SEED,
+                    TIMESTAMP_FORMAT, concat_log_frames)
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process locking on Windows, where the app runs as a single dev-server process
+    fcntl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pads = None
+    pq = None
+
+# Directory for on-disk caches of processed log data
+CACHE_DIR = os.environ.get('DATA_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+
+# Bump when the processed frame layout changes so stale caches are rebuilt
+CACHE_FORMAT_VERSION = 3
+
+# Also partition the Parquet log datasets by continent, so continent filters skip the other continents' files
+PARTITION_BY_CONTINENT = os.environ.get('PARTITION_BY_CONTINENT', '').lower() in ('1', 'true', 'yes')
+
+_PARTITION_MANIFEST = '_manifest.json'
+
+# Directory name Hive uses for a null partition value
+_NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+def source_signature(source_path):
+    """Identify a source file (or directory of files) by modification times and sizes, or None if missing"""
+    try:
+        stat = os.stat(source_path)
+    except FileNotFoundError:
+        return None
+    signature = {
+        'format': CACHE_FORMAT_VERSION,
+        'path': os.path.abspath(source_path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        # Settings that change how timestamps are parsed
+        'parsing': [TIMESTAMP_FORMAT, DATE_FORMAT, EPOCH_UNIT, SYNTHETIC_DATE_DAYS, SYNTHETIC_DATE_SEED, SYNTHETIC_DATE_END],
+    }
+    if GEOIP_RANGES:
+        # Countries looked up from IP addresses depend on the ranges file too
+        try:
+            geoip_stat = os.stat(GEOIP_RANGES)
+            signature['geoip'] = [os.path.abspath(GEOIP_RANGES), geoip_stat.st_mtime_ns, geoip_stat.st_size]
+        except FileNotFoundError:
+            signature['geoip'] = None
+    if os.path.isdir(source_path):
+        signature['files'] = sorted(
+            [entry.name, entry.stat().st_mtime_ns, entry.stat().st_size]
+            for entry in os.scandir(source_path) if entry.is_file()
+        )
+    return signature
+
+def source_offsets(signature):
+    """How many bytes of each source file a frame built from the given signature has read"""
+    if signature is None:
+        return {}
+    if 'files' in signature:
+        return {os.path.join(signature['path'], name): size for name, _, size in signature['files']}
+    return {signature['path']: signature['size']}
+
+def cache_path_for(source_path):
+    """Location of the partitioned Parquet cache for a source file"""
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(CACHE_DIR, 'logs', name)
+
+def cached_partitions(source_path):
+    """The partitions of the cache for a source file, or None if there is no cache"""
+    if pq is None:
+        return None
+    return PartitionedLogStore(cache_path_for(source_path)).current()
+
+def read_cached_frame(source_path, as_table=False):
+    """Memory-map the cached processed frame for a source file (as an Arrow table with as_table), or return None if it is missing or stale"""
+    if pq is None:
+        return None
+    store = PartitionedLogStore(cache_path_for(source_path))
+    try:
+        partitions = store.current()
+        if partitions is None or partitions.signature != source_signature(source_path):
+            return None
+        return store.read(partitions, as_table=as_table)
+    except (OSError, ValueError, pa.ArrowException) as e:
+        print(f"Ignoring unreadable data cache {store.root}: {e}")
+        return None
+
+def write_cached_frame(data, source_path, signature=None):
+    """Write the processed frame for a source file to its Parquet cache, under the signature it was read at"""
+    if pq is None:
+        return
+    store = PartitionedLogStore(cache_path_for(source_path))
+    if signature is None:
+        signature = source_signature(source_path)
+    try:
+        store.write(data, signature)
+    except (OSError, pa.ArrowException) as e:
+        print(f"Could not write data cache {store.root}: {e}")
+
+def append_cached_rows(rows, source_path, signature):
+    """Add rows read from the end of a source file to its Parquet cache, which then matches the given signature"""
+    if pq is None:
+        return
+    store = PartitionedLogStore(cache_path_for(source_path))
+    try:
+        store.append(rows, signature)
+    except (OSError, ValueError, pa.ArrowException) as e:
+        # The cache would be missing these rows, so make the next start read the source instead
+        print(f"Could not append to data cache {store.root}: {e}")
+        store.invalidate()
+
+@contextlib.contextmanager
+def _exclusive(directory, thread_lock):
+    """Hold the lock file of a directory against other processes, and thread_lock against other threads"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'lock'), 'a') as lock_file, thread_lock:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class LogPartitions:
+    """The files of one version of a partitioned log dataset, with the partition each one holds"""
+    
+    def __init__(self, root, manifest):
+        self.root = root
+        self.signature = manifest['signature']
+        self.partition_by = manifest['partition_by']
+        self.entries = manifest['files']
+    
+    def files(self, start=None, end=None, continent=None):
+        """Paths of the files whose partitions can hold rows timestamped in [start, end) and, if given, from `continent`"""
+        return [os.path.join(self.root, entry['path']) for entry in self._select(start, end, continent)]
+    
+    def read_days(self, start=None, end=None, continent=None):
+        """Yield the rows of each day that can hold rows timestamped in [start, end), as one frame per day in timestamp order"""
+        by_day = OrderedDict()
+        for entry in self._select(start, end, continent):
+            by_day.setdefault(entry['date'], []).append(os.path.join(self.root, entry['path']))
+        if not by_day:
+            yield self.empty_table().to_pandas()
+        # Rows without a timestamp sort after all the others
+        for day in sorted(by_day, key=lambda day: (day is None, day or '')):
+            data = concat_log_frames([pq.read_table(path).to_pandas() for path in by_day[day]])
+            # Continent partitions and appended files interleave in time
+            if not data['timestamp'].is_monotonic_increasing:
+                data = data.sort_values('timestamp', kind='stable', ignore_index=True)
+            yield data
+    
+    def empty_table(self):
+        """A table with the stored columns and no rows"""
+        # Every version keeps at least one file, even if it holds no rows
+        return pq.read_schema(os.path.join(self.root, self.entries[0]['path'])).empty_table()
+    
+    def _select(self, start, end, continent):
+        # Partition dates are ISO strings, which sort like the days they name
+        first = pd.Timestamp(start).strftime('%Y-%m-%d') if start is not None else None
+        last = (pd.Timestamp(end) - pd.Timedelta(1, 'ns')).strftime('%Y-%m-%d') if end is not None else None
+        selected = []
+        for entry in self.entries:
+            day = entry['date']
+            # Rows without a timestamp are never pruned
+            if day is not None and ((first is not None and day < first) or (last is not None and day > last)):
+                continue
+            if continent is not None and 'continent' in self.partition_by and entry['continent'] != continent:
+                continue
+            selected.append(entry)
+        return selected
+
+class PartitionedLogStore:
+    """Log frames as Parquet files partitioned by day (and optionally continent), listed by a manifest that is swapped in atomically"""
+    
+    # Files a partition may gather through appends before they are merged into one
+    MAX_PARTITION_FILES = 16
+    
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+    
+    def current(self):
+        """The partitions of the current version, or None if nothing has been written"""
+        try:
+            with open(os.path.join(self.root, _PARTITION_MANIFEST), encoding='utf-8') as f:
+                return LogPartitions(self.root, json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def stamp(self):
+        """Modification time of the manifest, which changes with every write, or None if nothing has been written"""
+        try:
+            return os.stat(os.path.join(self.root, _PARTITION_MANIFEST)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
+    def read(self, partitions=None, start=None, end=None, continent=None, as_table=False):
+        """Map the rows of a version (the current one by default) in timestamp order, or None if nothing has been written
+
+        With a date range or continent, only the files of the partitions that can hold matching rows are read.
+        as_table returns the rows as an Arrow table rather than a frame.
+        """
+        partitions = partitions or self.current()
+        if partitions is None:
+            return None
+        files = partitions.files(start, end, continent)
+        if files:
+            table = pads.dataset(files, format='parquet').to_table()
+        else:
+            table = partitions.empty_table()
+        if as_table:
+            # One dictionary per column, so the table can be written to an Arrow IPC file as it is
+            return table.sort_by('timestamp').unify_dictionaries()
+        data = table.to_pandas()
+        # Continent partitions and appended files interleave in time
+        if not data['timestamp'].is_monotonic_increasing:
+            data = data.sort_values('timestamp', kind='stable', ignore_index=True)
+        return data
+    
+    def write(self, data, signature=None):
+        """Replace the stored frame and return the new partitions"""
+        with _exclusive(self.root, self._lock):
+            previous = self.current()
+            partition_by = ['date', 'continent'] if PARTITION_BY_CONTINENT and 'continent' in data.columns else ['date']
+            entries = self._write_files(data, partition_by)
+            if not entries:
+                # Keep one empty file so the columns are still known
+                entries = self._write_files(data, partition_by, empty=True)
+            return self._commit(entries, signature, partition_by, previous)
+    
+    def append(self, rows, signature=None):
+        """Add rows as new files in their partitions and return the new partitions, or None if nothing was stored to append to"""
+        with _exclusive(self.root, self._lock):
+            previous = self.current()
+            if previous is None:
+                return None
+            entries = previous.entries + self._write_files(rows, previous.partition_by)
+            return self._commit(self._compact(entries), signature, previous.partition_by, previous)
+    
+    def invalidate(self):
+        """Forget the current version; its files are removed by the next write"""
+        with _exclusive(self.root, self._lock):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.root, _PARTITION_MANIFEST))
+    
+    def _write_files(self, data, partition_by, empty=False):
+        if empty:
+            groups = {(pd.NaT,) + (None,) * (len(partition_by) - 1): np.arange(0)}
+        elif len(data):
+            keys = [data['timestamp'].dt.floor('D')] + [data[column] for column in partition_by[1:]]
+            groups = data.groupby(keys, observed=True, dropna=False, sort=True).indices
+        else:
+            groups = {}
+        entries = []
+        for key, positions in groups.items():
+            values = key if isinstance(key, tuple) else (key,)
+            entry = {
+                name: None if pd.isna(value) else value.strftime('%Y-%m-%d') if name == 'date' else str(value)
+                for name, value in zip(partition_by, values)
+            }
+            # Hive-style directories, readable by other Parquet tools too
+            directories = [
+                f"{name}={quote(entry[name], safe='') if entry[name] is not None else _NULL_PARTITION}"
+                for name in partition_by
+            ]
+            entry['path'] = os.path.join(*directories, f'part-{uuid.uuid4().hex}.parquet')
+            path = os.path.join(self.root, entry['path'])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(data.iloc[positions], preserve_index=False), path)
+            entries.append(entry)
+        return entries
+    
+    def _compact(self, entries):
+        # Merge the files of partitions that appends have split into too many, keeping them in append order
+        by_partition = OrderedDict()
+        for entry in entries:
+            by_partition.setdefault(os.path.dirname(entry['path']), []).append(entry)
+        compacted = []
+        for directory, group in by_partition.items():
+            if len(group) <= self.MAX_PARTITION_FILES:
+                compacted.extend(group)
+                continue
+            table = pads.dataset([os.path.join(self.root, entry['path']) for entry in group], format='parquet').to_table()
+            entry = dict(group[0], path=os.path.join(directory, f'part-{uuid.uuid4().hex}.parquet'))
+            pq.write_table(table, os.path.join(self.root, entry['path']))
+            compacted.append(entry)
+        return compacted
+    
+    def _commit(self, entries, signature, partition_by, previous):
+        manifest = {'signature': signature, 'partition_by': partition_by, 'files': entries}
+        manifest_path = os.path.join(self.root, _PARTITION_MANIFEST)
+        with open(f'{manifest_path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(f'{manifest_path}.tmp', manifest_path)
+        self._remove_unused_files(manifest, previous)
+        return LogPartitions(self.root, manifest)
+    
+    def _remove_unused_files(self, manifest, previous):
+        # Keep the previous version's files; readers that listed them may still be scanning them
+        keep = {entry['path'] for entry in manifest['files']}
+        keep.update(entry['path'] for entry in (previous.entries if previous else ()))
+        for directory, _, names in os.walk(self.root, topdown=False):
+            for name in names:
+                path = os.path.join(directory, name)
+                if name.endswith('.parquet') and os.path.relpath(path, self.root) not in keep:
+                    with contextlib.suppress(OSError):
+                        os.remove(path)
+            if directory != self.root:
+                # Only succeeds once the partition directory is empty
+                with contextlib.suppress(OSError):
+                    os.rmdir(directory)
+
+class SharedDatasetStore:
+    """Versioned log frames in memory-mapped Arrow files that every worker process can read"""
+    
+    # Appended segments published before the frame is rewritten as a single file
+    MAX_SEGMENTS = 16
+    
+    def __init__(self, root):
+        self.root = root
+        self._local = None
+        self._local_lock = threading.Lock()
+    
+    @property
+    def enabled(self):
+        return pa is not None
+    
+    def _locked(self):
+        return _exclusive(self.root, self._local_lock)
+    
+    def try_lease(self, name):
+        """Take an exclusive lock held until the process exits, or return None if another process holds it"""
+        os.makedirs(self.root, exist_ok=True)
+        lease = open(os.path.join(self.root, f'{name}.lease'), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lease, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lease.close()
+                return None
+        return lease
+    
+    def current(self):
+        """The manifest of the current version ({'version', 'files', 'source', 'offsets'}), or None if nothing is published"""
+        if not self.enabled:
+            return self._local and self._local[0]
+        try:
+            with open(os.path.join(self.root, 'CURRENT'), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Manifests from before segments were introduced are republished from the source
+        return manifest if 'files' in manifest else None
+    
+    def segments(self, manifest, files=None):
+        """Map each segment file of a manifest, or just the given ones, as its own frame read straight from the shared pages"""
+        if not self.enabled:
+            return [self._local[1]]
+        frames = []
+        for name in manifest['files'] if files is None else files:
+            source = pa.memory_map(os.path.join(self.root, name))
+            frames.append(pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True))
+        return frames
+    
+    def load(self, manifest, files=None):
+        """The frame for a manifest, or for just the given segment files of it, as one frame"""
+        return concat_log_frames(self.segments(manifest, files))
+    
+    def publish(self, data, source=None):
+        """Publish a frame as the next version and return its manifest"""
+        with self._locked():
+            return self._publish(data, source, source_offsets(source))
+    
+    def publish_if_stale(self, source_path, loader):
+        """Publish the frame from loader() unless the current version was built from the source as it is now; return the manifest
+
+        loader() returns the frame (or an Arrow table) and whether it was read from the source. A stand-in frame is published without
+        a source signature, so the next boot or worker tries the source again.
+        """
+        with self._locked():
+            source = source_signature(source_path)
+            current = self.current()
+            if current is not None and current['source'] == source:
+                return current
+            # Read again if the source grew while loading, so the recorded offsets match the data
+            for _ in range(3):
+                data, from_source = loader()
+                if not from_source:
+                    # Keep a stand-in that is already published rather than publishing another version of it
+                    if current is not None and current['source'] is None:
+                        return current
+                    source = None
+                    break
+                loaded = source_signature(source_path)
+                if loaded == source:
+                    break
+                source = loaded
+            else:
+                source = None
+            return self._publish(data, source, source_offsets(source))
+    
+    def append(self, rows, source, offsets):
+        """Publish the current frame plus `rows` as the next version, writing only the new rows; return the manifest"""
+        with self._locked():
+            current = self.current()
+            if current is None:
+                return self._publish(rows, source, offsets)
+            if not self.enabled:
+                return self._publish(concat_log_frames([self._local[1], rows]), source, offsets)
+            if len(current['files']) >= self.MAX_SEGMENTS:
+                return self._publish(concat_log_frames([self.load(current), rows]), source, offsets)
+            return self._publish(rows, source, offsets, segments=current['files'])
+    
+    def _publish(self, data, source, offsets, segments=()):
+        current = self.current()
+        version = (current['version'] if current else 0) + 1
+        name = f'dataset-{version}.arrow'
+        manifest = {'version': version, 'files': [*segments, name], 'source': source, 'offsets': offsets}
+        if not self.enabled:
+            self._local = (manifest, data)
+            return manifest
+        
+        # Uncompressed IPC so readers can map the columns without decoding them
+        table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+        data_path = os.path.join(self.root, name)
+        with pa.OSFile(f'{data_path}.tmp', 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(f'{data_path}.tmp', data_path)
+        
+        # Swapping the manifest in one rename is what makes the new version visible atomically
+        manifest_path = os.path.join(self.root, 'CURRENT')
+        with open(f'{manifest_path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(f'{manifest_path}.tmp', manifest_path)
+        
+        self._remove_unused_files(manifest, current)
+        return manifest
+    
+    def _remove_unused_files(self, manifest, previous):
+        # Keep the previous version's files; workers that have not refreshed yet may still map them
+        keep = set(manifest['files']) | set(previous['files'] if previous else ())
+        for name in os.listdir(self.root):
+            if name.startswith('dataset-') and name.endswith('.arrow') and name not in keep:
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except OSError:
+                    # Windows refuses to delete files that are still mapped
+                    continue
+
+class SessionDatasetStore:
+    """Per-owner datasets held in memory under a byte budget, with least-recently-used ones spilled to partitioned Parquet"""
+    
+    def __init__(self, root, memory_budget, factory):
+        # factory(frame, version, partitions=...) wraps a frame in whatever object callers want back from get();
+        # the partitions are the LogPartitions on disk holding the frame, or None
+        self.root = root
+        self.memory_budget = memory_budget
+        self.factory = factory
+        self._entries = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self):
+        return pq is not None
+    
+    def _store(self, owner):
+        digest = hashlib.sha1(owner.encode('utf-8')).hexdigest()
+        return PartitionedLogStore(os.path.join(self.root, digest))
+    
+    def get(self, owner):
+        """The owner's dataset, reloaded from disk if evicted or replaced by another worker, or None"""
+        with self._lock:
+            entry = self._entries.get(owner)
+            if entry is not None:
+                self._entries.move_to_end(owner)
+        if not self.enabled:
+            return entry and entry[1]
+        
+        # The spill manifest is written on every put, so its mtime tells us whether another worker replaced it
+        store = self._store(owner)
+        stamp = store.stamp()
+        if stamp is None:
+            return None
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        partitions = store.current()
+        return self._insert(owner, stamp, store.read(partitions), partitions)
+    
+    def put(self, owner, data):
+        """Store a new dataset for an owner and return the wrapped value"""
+        if not self.enabled:
+            return self._insert(owner, time.time_ns(), data)
+        store = self._store(owner)
+        partitions = store.write(data)
+        return self._insert(owner, store.stamp(), data, partitions)
+    
+    def _insert(self, owner, stamp, data, partitions=None):
+        value = self.factory(data, f'{owner}@{stamp}', partitions=partitions)
+        size = int(data.memory_usage(index=False, deep=True).sum())
+        with self._lock:
+            previous = self._entries.pop(owner, None)
+            if previous is not None:
+                self._memory_used -= previous[2]
+            self._entries[owner] = (stamp, value, size)
+            self._memory_used += size
+            # Always keep the entry just inserted, even if it alone exceeds the budget
+            while self._memory_used > self.memory_budget and len(self._entries) > 1:
+                evicted_owner, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._memory_used -= evicted_size
+                if not self.enabled:
+                    print(f"Dropped uploaded dataset for {evicted_owner}: memory budget exceeded and pyarrow is not installed")
+        return value
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Importing app loads the shared dataset, so keep its caches out of the checkout. With no log file there,
+# it falls back to the sample data.
+_SCRATCH = tempfile.mkdtemp(prefix='dashboard-tests-')
+os.environ['DATA_CACHE_DIR'] = os.path.join(_SCRATCH, 'cache')
+os.environ['LOG_PATH'] = os.path.join(_SCRATCH, 'web_server_logs.csv')
@@ -0,0 +1,123 @@
+import pandas as pd
+import pytest
+
+import ingest
+
+ROWS = [
+    ['2026-09-30', '04:11:04', '224.87.165.96', 'GET', '/product/details/mobile', 200, 'Product View', 'Japan', 'Asia'],
+    ['2026-09-20', '00:15:25', '220.66.154.153', 'GET', '/scheduledemo.php', 200, 'Demo Request', 'Japan', 'Asia'],
+    ['2026-09-21', '13:02:51', '10.0.0.7', 'POST', '/jobs/apply', 404, 'Job Request', 'Canada', 'North America'],
+    ['2026-09-22', '18:40:09', '10.0.0.8', 'GET', '/events', 200, 'Event Inquiry', 'Canada', 'North America'],
+]
+COLUMNS = ['Date', 'Time', 'IP Address', 'Method', 'URL/Path', 'Status Code', 'Request Type', 'Country', 'Continent']
+
+ACCESS_LOG = (
+    '1.2.3.4 - - [17/Oct/2026:10:00:00 +0000] "GET /jobs HTTP/1.1" 200 12\n'
+    '5.6.7.8 - - [17/Oct/2026:10:00:01 +0000] "POST /demo?ref=mail HTTP/1.1" 404 1\n'
+)
+
+def write_csv(path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+
+def test_chunk_with_blank_categorical_column(tmp_path):
+    # The first chunk has no request types at all, so its categories are not text
+    rows = [row[:6] + [None] + row[7:] for row in ROWS[:2]] + ROWS[2:]
+    write_csv(tmp_path / 'logs.csv', rows)
+
+    result = ingest.read_log_files([str(tmp_path / 'logs.csv')], workers=1, chunk_rows=2)
+
+    frame = result.frame
+    assert len(frame) == 4
+    assert isinstance(frame['request_type'].dtype, pd.CategoricalDtype)
+    assert sorted(frame['request_type'].dropna()) == ['Event Inquiry', 'Job Request']
+    assert frame['request_type'].isna().sum() == 2
+
+def test_directory_of_csv_and_access_log(tmp_path):
+    write_csv(tmp_path / 'export.csv', ROWS)
+    (tmp_path / 'access.log').write_text(ACCESS_LOG)
+    (tmp_path / 'notes.txt').write_text('not a log')
+
+    frame = ingest.read_logs(str(tmp_path)).frame
+
+    assert len(frame) == 6
+    assert frame['timestamp'].is_monotonic_increasing
+    access_rows = frame[frame['timestamp'] >= pd.Timestamp('2026-10-17')]
+    assert list(access_rows['path']) == ['/jobs', '/demo']
+    assert list(access_rows['continent']) == [ingest.UNKNOWN_CONTINENT] * 2
+    assert list(access_rows['request_category']) == ['Job Request', 'Demo Request']
+    assert frame['country'].notna().sum() == 4
+
+def test_synthetic_dates_need_a_fixed_end(tmp_path, monkeypatch):
+    pd.DataFrame([row[1:] for row in ROWS], columns=COLUMNS[1:]).to_csv(tmp_path / 'times.csv', index=False)
+    monkeypatch.setattr(ingest, 'SYNTHETIC_DATE_DAYS', 7)
+
+    monkeypatch.setattr(ingest, 'SYNTHETIC_DATE_END', None)
+    with pytest.raises(ValueError, match='SYNTHETIC_DATE_END'):
+        ingest.read_logs(str(tmp_path / 'times.csv'))
+
+    monkeypatch.setattr(ingest, 'SYNTHETIC_DATE_END', '2026-10-17')
+    first = ingest.read_logs(str(tmp_path / 'times.csv')).frame
+    again = ingest.read_logs(str(tmp_path / 'times.csv')).frame
+    assert first['timestamp'].equals(again['timestamp'])
+    assert first['timestamp'].min() >= pd.Timestamp('2026-10-11')
+    assert first['timestamp'].max() < pd.Timestamp('2026-10-18')
+
+def test_geoip_ranges_with_header_and_integer_bounds(tmp_path):
+    path = tmp_path / 'ip2location.csv'
+    path.write_text('ip_from,ip_to,country_code\n0,16777215,US\n16777216,16777471,AU\n"16777472","16778239","KR"\n')
+
+    table = ingest.load_geoip_table(str(path))
+
+    assert table.starts.tolist() == [0, 16777216, 16777472]
+    assert table.ends.tolist() == [16777215, 16777471, 16778239]
+    assert list(table.countries[table.codes]) == ['United States', 'Australia', 'South Korea']
+
+def test_geoip_ranges_with_dotted_bounds(tmp_path):
+    path = tmp_path / 'dbip.csv'
+    path.write_text(
+        'start,end,country\n'
+        '10.0.0.0,10.0.0.255,DE\n'
+        '2001:db8::,2001:db8::ffff,FR\n'
+        '1.0.0.0,1.0.0.255,ZZ\n'
+        '8.8.8.0,8.8.8.255,US\n'
+    )
+
+    table = ingest.load_geoip_table(str(path))
+    packed = ingest.pack_ipv4(['10.0.0.7', '8.8.8.8', '1.0.0.1', '9.9.9.9', '10.0.1.0', '0.0.0.0'])
+
+    found = ingest.lookup_country_codes(table, packed)
+    names = [table.countries[code] if code >= 0 else None for code in found]
+    assert names == ['Germany', 'United States', None, None, None, None]
+
+def test_geoip_table_without_usable_ranges_warns(tmp_path, capsys):
+    path = tmp_path / 'v6.csv'
+    path.write_text('2001:db8::,2001:db8::ffff,FR\n')
+
+    table = ingest.load_geoip_table(str(path))
+
+    assert len(table.starts) == 0
+    assert (ingest.lookup_country_codes(table, ingest.pack_ipv4(['10.0.0.1'])) == -1).all()
+    assert 'No IPv4 ranges' in capsys.readouterr().out
+
+def test_log_tail_holds_back_a_partial_line(tmp_path):
+    path = tmp_path / 'logs.csv'
+    write_csv(path, ROWS[:3])
+    header, first, second, third = path.read_text().splitlines(keepends=True)
+    # The writer is mid-line when following starts, then finishes the line and starts another
+    path.write_text(header + first + second[:20])
+    tail = ingest.LogTail(str(path), {str(path): path.stat().st_size})
+    assert tail.read() is None
+
+    with open(path, 'a') as f:
+        f.write(second[20:] + third[:10])
+    assert list(tail.read().frame['path']) == ['/scheduledemo.php']
+    assert tail.offsets[str(path)] == path.stat().st_size - 10
+    assert tail.read() is None
+
+    with open(path, 'a') as f:
+        f.write(third[10:])
+    assert list(tail.read().frame['path']) == ['/jobs/apply']
+
+    path.write_text(header + first)
+    with pytest.raises(ingest.LogRotated):
+        tail.read()
@@ -0,0 +1,116 @@
+import os
+
+import pandas as pd
+
+import ingest
+import storage
+
+LOG_CSV = (
+    'Date,Time,IP Address,Method,URL/Path,Status Code,Request Type,Country,Continent\n'
+    '2026-09-30,04:11:04,224.87.165.96,GET,/product/details/mobile,200,Product View,Japan,Asia\n'
+    '2026-09-20,00:15:25,220.66.154.153,GET,/scheduledemo.php,200,Demo Request,Japan,Asia\n'
+    '2026-09-21,13:02:51,10.0.0.7,POST,/jobs/apply,404,Job Request,Canada,North America\n'
+)
+
+def read_source(path):
+    return ingest.read_logs(str(path)).frame
+
+def test_fallback_is_published_without_a_source(tmp_path):
+    source = tmp_path / 'logs.csv'
+    source.write_text(LOG_CSV)
+    store = storage.SharedDatasetStore(str(tmp_path / 'shared'))
+    stand_in = read_source(source).iloc[:1]
+
+    manifest = store.publish_if_stale(str(source), lambda: (stand_in, False))
+    assert manifest['source'] is None
+    assert len(store.load(manifest)) == 1
+
+    # A second failure keeps the published stand-in instead of publishing it again
+    assert store.publish_if_stale(str(source), lambda: (stand_in, False))['version'] == manifest['version']
+
+    # Once the source reads, it replaces the stand-in even though the file itself did not change
+    manifest = store.publish_if_stale(str(source), lambda: (read_source(source), True))
+    assert manifest['source'] == storage.source_signature(str(source))
+    assert len(store.load(manifest)) == 3
+    assert store.publish_if_stale(str(source), lambda: 1 / 0)['version'] == manifest['version']
+
+def test_signature_covers_timestamp_parsing_settings(tmp_path, monkeypatch):
+    source = tmp_path / 'logs.csv'
+    source.write_text(LOG_CSV)
+    before = storage.source_signature(str(source))
+    assert storage.source_signature(str(source)) == before
+    for name, value in [('SYNTHETIC_DATE_END', '2026-10-17'), ('DATE_FORMAT', '%d/%m/%Y'), ('EPOCH_UNIT', 'ms')]:
+        with monkeypatch.context() as patch:
+            patch.setattr(storage, name, value)
+            assert storage.source_signature(str(source)) != before
+
+def partition_days(partitions, paths):
+    return sorted({os.path.relpath(path, partitions.root).split(os.sep)[0] for path in paths})
+
+def test_partition_files_pruned_to_date_range(tmp_path, monkeypatch):
+    source = tmp_path / 'logs.csv'
+    source.write_text(LOG_CSV)
+    monkeypatch.setattr(storage, 'PARTITION_BY_CONTINENT', True)
+    partitions = storage.PartitionedLogStore(str(tmp_path / 'cache')).write(read_source(source))
+
+    # The end is exclusive, so the range ending at midnight leaves out the day it starts
+    days = partition_days(partitions, partitions.files(pd.Timestamp('2026-09-20'), pd.Timestamp('2026-09-30')))
+    assert days == ['date=2026-09-20', 'date=2026-09-21']
+    # Any part of the last day keeps its partition
+    days = partition_days(partitions, partitions.files(pd.Timestamp('2026-09-21'), pd.Timestamp('2026-09-30 00:00:01')))
+    assert days == ['date=2026-09-21', 'date=2026-09-30']
+    assert partitions.files(pd.Timestamp('2026-09-22'), pd.Timestamp('2026-09-30')) == []
+    assert len(partitions.files(pd.Timestamp('2026-09-20'), pd.Timestamp('2026-10-01'), 'Asia')) == 2
+
+    days = list(partitions.read_days(pd.Timestamp('2026-09-21'), pd.Timestamp('2026-10-01')))
+    assert [list(day['country']) for day in days] == [['Canada'], ['Japan']]
+    empty = list(partitions.read_days(pd.Timestamp('2026-10-01'), pd.Timestamp('2026-10-02')))
+    assert len(empty) == 1 and len(empty[0]) == 0 and 'timestamp' in empty[0].columns
+
+def test_shared_store_versions_seen_by_every_worker(tmp_path, monkeypatch):
+    source = tmp_path / 'logs.csv'
+    source.write_text(LOG_CSV)
+    frame = read_source(source)
+    store = storage.SharedDatasetStore(str(tmp_path / 'shared'))
+    # Another worker process, with its own store object on the same directory
+    worker = storage.SharedDatasetStore(str(tmp_path / 'shared'))
+
+    first = store.publish(frame.iloc[:1])
+    assert worker.current() == first
+    second = store.append(frame.iloc[1:2], None, {})
+    assert second['version'] == first['version'] + 1
+    assert second['files'][0] == first['files'][0] and len(second['files']) == 2
+    pd.testing.assert_frame_equal(worker.load(second), frame.iloc[:2], check_categorical=False)
+
+    # Past the segment limit the frame is rewritten as one file, and files two versions old are removed
+    monkeypatch.setattr(storage.SharedDatasetStore, 'MAX_SEGMENTS', 2)
+    third = store.append(frame.iloc[2:], None, {})
+    assert len(third['files']) == 1
+    pd.testing.assert_frame_equal(worker.load(third), frame, check_categorical=False)
+    fourth = store.publish(frame)
+    names = sorted(name for name in os.listdir(store.root) if name.endswith('.arrow'))
+    assert names == sorted(set(third['files'] + fourth['files']))
+
+def test_session_store_isolates_owners_and_spills_under_budget(tmp_path):
+    source = tmp_path / 'logs.csv'
+    source.write_text(LOG_CSV)
+    frame = read_source(source)
+    size = int(frame.memory_usage(index=False, deep=True).sum())
+    factory = lambda data, version, partitions=None: (data, version, partitions)
+    sessions = storage.SessionDatasetStore(str(tmp_path / 'sessions'), size * 3 // 2, factory)
+    worker = storage.SessionDatasetStore(str(tmp_path / 'sessions'), size * 3 // 2, factory)
+
+    alice = sessions.put('alice', frame)
+    assert sessions.get('bob') is None
+    assert sessions.get('alice') is alice
+
+    # Bob's upload goes over the budget, so Alice's least recently used dataset is dropped from memory
+    sessions.put('bob', frame.iloc[:2])
+    assert list(sessions._entries) == ['bob']
+    reloaded = sessions.get('alice')
+    assert reloaded is not alice and reloaded[2] is not None
+    pd.testing.assert_frame_equal(reloaded[0], frame, check_categorical=False)
+
+    # An upload handled by another worker replaces the dataset this one holds
+    worker.put('alice', frame.iloc[:1])
+    assert len(sessions.get('alice')[0]) == 1